@@ -0,0 +1,92 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import respy as rp
+
+
+def main():
+    """Compare the numerical integration of expected value functions.
+
+    The model is solved with each integration method and the expected value functions
+    of the first period are compared to a Monte Carlo solution with many draws. The
+    time is measured for a second solution such that compilation is excluded. The
+    comparison is written to ``integration_results.txt``.
+
+    """
+    model = sys.argv[1] if len(sys.argv) > 1 else "kw_97_basic"
+    n_periods = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    n_reference_draws = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+
+    params, options = rp.get_example_model(model, with_data=False)
+    options = {**options, "n_periods": n_periods, "interpolation_points": -1}
+
+    reference, _, _ = _solve(
+        params, {**options, "solution_draws": n_reference_draws}, time_solution=False
+    )
+
+    methods = {
+        "monte_carlo": {"solution_integration": "monte_carlo"},
+        "analytic": {"solution_integration": "analytic"},
+    }
+    for rule in ["gauss_hermite", "smolyak"]:
+        for order in [1, 2, 3, 4]:
+            methods[f"{rule}_{order}"] = {
+                "solution_integration": rule,
+                "solution_quadrature_order": order,
+            }
+
+    rows = []
+    for method, method_options in methods.items():
+        expected_value_functions, n_nodes, duration = _solve(
+            params, {**options, **method_options}
+        )
+        abs_error = np.abs(expected_value_functions - reference)
+        rows.append(
+            {
+                "method": method,
+                "nodes": n_nodes,
+                "seconds": duration,
+                "mean_abs_error": abs_error.mean(),
+                "max_rel_error": (abs_error / np.abs(reference)).max(),
+            }
+        )
+
+    # Save the comparison to file.
+    with open("integration_results.txt", "w") as file:
+        file.write(pd.DataFrame(rows).set_index("method").to_string())
+        file.write("\n")
+
+
+def _solve(params, options, time_solution=True):
+    solve = rp.get_solve_func(params, options)
+    state_space = solve(params)
+
+    duration = None
+    if time_solution:
+        start = time.perf_counter()
+        # Changing the discount factor forces a new solution.
+        other_params = params.copy()
+        other_params.loc[("delta", "delta"), "value"] += 1e-8
+        solve(other_params)
+        state_space = solve(params)
+        duration = (time.perf_counter() - start) / 2
+
+    expected_value_functions = np.concatenate(
+        [
+            state_space.expected_value_functions[key]
+            for key in state_space.get_dense_keys_from_period(0)
+        ]
+    )
+    # Analytic solutions without interpolation have no draws.
+    n_nodes = max(
+        (draws.shape[0] for draws in state_space.base_draws_sol.values()), default=0
+    )
+
+    return expected_value_functions, n_nodes, duration
+
+
+if __name__ == "__main__":
+    main()
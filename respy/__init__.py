@@ -19,7 +19,9 @@ from respy.method_of_simulated_moments import get_diag_weighting_matrix  # noqa:
 from respy.method_of_simulated_moments import get_flat_moments  # noqa: F401
 from respy.method_of_simulated_moments import get_moment_errors_func  # noqa: F401
 from respy.simulate import get_simulate_func  # noqa: F401
+from respy.solve import get_batch_solve_func  # noqa: F401
 from respy.solve import get_solve_func  # noqa: F401
+from respy.solve import get_state_space_size  # noqa: F401
 from respy.tests.random_model import add_noise_to_params  # noqa: F401
 
 
@@ -27,6 +29,8 @@ __all__ = [
     "get_example_model",
     "get_parameter_constraints",
     "get_solve_func",
+    "get_batch_solve_func",
+    "get_state_space_size",
     "get_simulate_func",
     "get_log_like_func",
     "get_moment_errors_func",
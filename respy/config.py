@@ -40,6 +40,15 @@ correct position. Invalid entries in the indexer are filled with
 :class:`IndexError` as negative indices cannot exceed the length of the indexed array
 dimension.
 
+"""
+INDEXER_MAX_SPARSITY = 4
+"""int : Maximum ratio of possible to existing states for the indexer lookup table.
+
+The indexer encodes core states as integers. If the number of possible codes exceeds
+the number of core states by more than this factor, the flat lookup table from codes to
+states is not created and states are looked up with a binary search in the sorted codes
+to save memory.
+
 """
 
 # Some assert functions take rtol instead of decimals
@@ -47,6 +56,42 @@ TOL_REGRESSION_TESTS = 1e-10
 
 SEED_STARTUP_ITERATION_GAP = 1_000_000
 
+STATE_SPACE_CACHE_VERSION = 4
+"""int : Version of the layout of cached state spaces.
+
+The version is part of the key of a cached state space. Increment it whenever the
+objects stored in the cache change such that outdated caches are not loaded.
+
+"""
+
+SOLUTION_STAGES = {
+    "rewards": {"categories": r"(wage|nonpec)_.+", "depends_on": []},
+    "transitions": {"categories": r"exogenous_process_.+", "depends_on": []},
+    "draws": {"categories": r"shocks_.+", "depends_on": []},
+    "expected_value_functions": {
+        "categories": r"delta|beta",
+        "depends_on": ["rewards", "transitions", "draws"],
+    },
+}
+"""dict : Stages of the solution and the parameters which enter them.
+
+Each stage has a regex matching the categories of parameters which enter the stage
+directly and the stages whose outputs enter the stage. A stage is only recomputed if one
+of its inputs has changed since the previous solution. Other parameters like type
+probabilities or measurement errors do not affect the solution.
+
+"""
+
+LOG_LIKE_STAGES = {
+    **SOLUTION_STAGES,
+    "individual_log_likelihoods": {
+        "categories": r"meas_error",
+        "depends_on": ["expected_value_functions"],
+    },
+    "type_probabilities": {"categories": r"type_[0-9]+", "depends_on": []},
+}
+"""dict : Stages of the likelihood. See :data:`SOLUTION_STAGES`."""
+
 DEFAULT_OPTIONS = {
     "estimation_draws": 200,
     "estimation_seed": 1,
@@ -60,6 +105,13 @@ DEFAULT_OPTIONS = {
     "negative_choice_set": {},
     "monte_carlo_sequence": "sobol",
     "cache_compression": "snappy",
+    "cache_format": "npy",
+    "cache_max_bytes": 2 ** 30,
+    "solution_out_of_core": False,
+    "state_space_n_workers": 1,
+    "solution_cache_size": 0,
+    "solution_integration": "monte_carlo",
+    "solution_quadrature_order": 2,
 }
 
 KEANE_WOLPIN_1994_MODELS = [f"kw_94_{suffix}" for suffix in ["one", "two", "three"]]
@@ -161,7 +161,7 @@ def create_transition_objects(
         for exog in exogenous_grid
     ]
     reachable_dense_keys = [
-        core_key_and_dense_index_to_dense_key[(core_key, dense_index)]
+        int(core_key_and_dense_index_to_dense_key[core_key, dense_index])
         for dense_index in reachable_dense_indices
     ]
 
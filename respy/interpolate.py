@@ -109,6 +109,14 @@ def kw_94_interpolation(
         not_interpolated,
         period_draws_emax_risk,
         optim_paras["delta"],
+        weights=(
+            None
+            if state_space.base_weights_sol is None
+            else {
+                dense_key: state_space.base_weights_sol[dense_key]
+                for dense_key in dense_keys_in_period
+            }
+        ),
     )
 
     # Create prediction model based on the random subset of points where the EMAX is
@@ -294,6 +302,7 @@ def _compute_lhs_variable(
     not_interpolated,
     draws,
     delta,
+    weights=None,
 ):
     """Calculate left-hand side variable for all states which are not interpolated.
 
@@ -319,15 +328,30 @@ def _compute_lhs_variable(
         Array with shape (n_draws, n_choices) containing draws.
     delta : float
         Discount factor.
+    weights : numpy.ndarray or None
+        Array with shape (n_draws,) containing the weights of the draws if they are the
+        nodes of a quadrature rule.
 
     """
-    expected_value_functions = calculate_expected_value_functions(
-        wages[not_interpolated],
-        nonpec[not_interpolated],
-        continuation_values[not_interpolated],
-        draws,
-        delta,
-    )
+    if weights is None:
+        expected_value_functions = calculate_expected_value_functions(
+            wages[not_interpolated],
+            nonpec[not_interpolated],
+            continuation_values[not_interpolated],
+            draws,
+            delta,
+        )
+    else:
+        value_functions, _ = calculate_value_functions_and_flow_utilities(
+            wages[not_interpolated, np.newaxis],
+            nonpec[not_interpolated, np.newaxis],
+            continuation_values[not_interpolated, np.newaxis],
+            draws,
+            delta,
+        )
+        expected_value_functions = np.clip(value_functions.max(axis=2), 0, None).dot(
+            weights
+        )
     endogenous = expected_value_functions - max_value_functions[not_interpolated]
 
     return endogenous
@@ -8,11 +8,13 @@ import pandas as pd
 from scipy import special
 
 from respy.conditional_draws import create_draws_and_log_prob_wages
+from respy.config import LOG_LIKE_STAGES
 from respy.config import MAX_FLOAT
 from respy.config import MIN_FLOAT
 from respy.parallelization import parallelize_across_dense_dimensions
 from respy.parallelization import split_and_combine_df
 from respy.pre_processing.data_checking import check_estimation_data
+from respy.pre_processing.model_processing import create_stage_keys
 from respy.pre_processing.model_processing import process_params_and_options
 from respy.pre_processing.process_covariates import identify_necessary_covariates
 from respy.shared import aggregate_keane_wolpin_utility
@@ -123,6 +125,7 @@ def get_log_like_func(
         options=options,
         return_scalar=return_scalar,
         return_comparison_plot_data=return_comparison_plot_data,
+        cache={},
     )
 
     return criterion_function
@@ -137,11 +140,17 @@ def log_like(
     options,
     return_scalar,
     return_comparison_plot_data,
+    cache,
 ):
     """Criterion function for the likelihood maximization.
 
     This function calculates the likelihood contributions of the sample.
 
+    The calculation is split into the stages in :data:`~respy.config.LOG_LIKE_STAGES`.
+    Outputs of stages whose inputs did not change since the previous evaluation are
+    reused. For example, if only type probabilities change, the model is not solved
+    again and the individual log likelihoods per type are reused.
+
     Parameters
     ----------
     params : pandas.Series
@@ -155,15 +164,40 @@ def log_like(
         Function which solves the model with new parameters.
     options : dict
         Contains model options.
+    cache : dict
+        Maps stages to their last key and output.
 
     """
     optim_paras, options = process_params_and_options(params, options)
 
-    state_space = solve(params)
+    stage_keys = create_stage_keys(params, LOG_LIKE_STAGES)
 
-    contribs, df, log_type_probabilities = _internal_log_like_obs(
-        state_space, df, base_draws_est, type_covariates, optim_paras, options
-    )
+    stage = "individual_log_likelihoods"
+    if cache.get(stage, (None,))[0] != stage_keys[stage]:
+        state_space = solve(params)
+        cache[stage] = (
+            stage_keys[stage],
+            _compute_individual_log_likelihoods(
+                state_space, df, base_draws_est, optim_paras, options
+            ),
+        )
+    per_individual_loglikes, df = cache[stage][1]
+
+    stage = "type_probabilities"
+    if (
+        optim_paras["n_types"] >= 2
+        and cache.get(stage, (None,))[0] != stage_keys[stage]
+    ):
+        # To not alter the attribute in the functools.partial, create a copy.
+        cache[stage] = (
+            stage_keys[stage],
+            _compute_log_type_probabilities(
+                type_covariates.copy(), optim_paras, options
+            ),
+        )
+    log_type_probabilities = cache[stage][1] if optim_paras["n_types"] >= 2 else None
+
+    contribs = _internal_log_like_obs(per_individual_loglikes, log_type_probabilities)
 
     # Return mean log likelihood or log likelihood contributions.
     out = contribs.mean() if return_scalar else contribs
@@ -177,17 +211,14 @@ def log_like(
     return out
 
 
-def _internal_log_like_obs(
-    state_space, df, base_draws_est, type_covariates, optim_paras, options
+def _compute_individual_log_likelihoods(
+    state_space, df, base_draws_est, optim_paras, options
 ):
-    """Calculate the likelihood contribution of each individual in the sample.
+    """Calculate the log likelihood of each individual in the sample per type.
 
     The function calculates all likelihood contributions for all observations in the
-    data which means all individual-period-type combinations.
-
-    Then, likelihoods are accumulated within each individual and type over all periods.
-    After that, the result is multiplied with the type-specific shares which yields the
-    contribution to the likelihood for each individual.
+    data which means all individual-period-type combinations. Then, likelihoods are
+    accumulated within each individual and type over all periods.
 
     Parameters
     ----------
@@ -199,9 +230,6 @@ def _internal_log_like_obs(
     base_draws_est : numpy.ndarray
         Array with shape (n_periods, n_draws, n_choices) containing i.i.d. draws from
         standard normal distributions.
-    type_covariates : pandas.DataFrame or None
-        If the model includes types, this is a :class:`pandas.DataFrame` containing the
-        covariates to compute the type probabilities.
     optim_paras : dict
         Dictionary with quantities that were extracted from the parameter vector.
     options : dict
@@ -209,17 +237,15 @@ def _internal_log_like_obs(
 
     Returns
     -------
-    contribs : numpy.ndarray
-        Array with shape (n_individuals,) containing contributions of individuals in the
-        empirical data.
+    per_individual_loglikes : pandas.DataFrame or pandas.Series
+        The log likelihoods of individuals with one column per type if the model has
+        types.
     df : pandas.DataFrame
-        Contains log wages, choices and
+        Contains log wages, choices and the log likelihoods of observations.
 
     """
     df = df.copy()
 
-    n_types = optim_paras["n_types"]
-
     wages = state_space.wages
     nonpecs = state_space.nonpecs
     continuation_values = {}
@@ -251,23 +277,39 @@ def _internal_log_like_obs(
     per_observation_loglikes = loglikes["loglike_choice"] + loglikes["loglike_wage"]
     per_individual_loglikes = per_observation_loglikes.groupby("identifier").sum()
 
-    if n_types >= 2:
-        # To not alter the attribute in the functools.partial, create a copy.
-        type_covariates = type_covariates.copy()
-        # Weight each type-specific individual log likelihood with the type probability.
-        log_type_probabilities = _compute_log_type_probabilities(
-            type_covariates, optim_paras, options
-        )
-        weighted_loglikes = per_individual_loglikes + log_type_probabilities
+    return per_individual_loglikes, df
+
+
+def _internal_log_like_obs(per_individual_loglikes, log_type_probabilities):
+    """Calculate the likelihood contribution of each individual in the sample.
+
+    The type-specific log likelihoods of individuals are weighted with the type
+    probabilities which yields the contribution to the likelihood of each individual.
 
+    Parameters
+    ----------
+    per_individual_loglikes : pandas.DataFrame or pandas.Series
+        The log likelihoods of individuals with one column per type if the model has
+        types.
+    log_type_probabilities : pandas.DataFrame or None
+        The log type probabilities of individuals if the model has types.
+
+    Returns
+    -------
+    contribs : numpy.ndarray
+        Array with shape (n_individuals,) containing contributions of individuals in the
+        empirical data.
+
+    """
+    if log_type_probabilities is not None:
+        weighted_loglikes = per_individual_loglikes + log_type_probabilities
         contribs = special.logsumexp(weighted_loglikes, axis=1)
     else:
         contribs = per_individual_loglikes.to_numpy().flatten()
-        log_type_probabilities = None
 
     contribs = np.clip(contribs, MIN_FLOAT, MAX_FLOAT)
 
-    return contribs, df, log_type_probabilities
+    return contribs
 
 
 @split_and_combine_df
@@ -481,8 +523,8 @@ def _simulate_log_probability_of_individuals_observed_choice(
 def _process_estimation_data(df, state_space, optim_paras, options):
     """Process estimation data.
 
-    All necessary objects for :func:`_internal_log_like_obs` dependent on the data are
-    produced.
+    All necessary objects for :func:`_compute_individual_log_likelihoods` dependent on
+    the data are produced.
 
     Some objects have to be repeated for each type which is a desirable format for the
     estimation where every observations is weighted by type probabilities.
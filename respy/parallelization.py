@@ -24,18 +24,22 @@ def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
     The decorator can be applied to functions without trailing parentheses. At the same
     time, the `*` prohibits to use the decorator with positional arguments.
 
+    The number of processes can also be set per call with the keyword argument
+    ``n_jobs`` which is not passed to the decorated function.
+
     """
 
     def decorator_parallelize_across_dense_dimensions(func):
         @functools.wraps(func)
         def wrapper_parallelize_across_dense_dimensions(*args, **kwargs):
             bypass = kwargs.pop("bypass", {})
+            n_jobs_ = kwargs.pop("n_jobs", n_jobs)
             dense_keys = _infer_dense_keys_from_arguments(args, kwargs)
 
             if dense_keys:
                 args_, kwargs_ = _broadcast_arguments(args, kwargs, dense_keys)
 
-                out = joblib.Parallel(n_jobs=n_jobs)(
+                out = joblib.Parallel(n_jobs=n_jobs_)(
                     joblib.delayed(func)(*args_[idx], **kwargs_[idx], **bypass)
                     for idx in dense_keys
                 )
@@ -29,6 +29,22 @@ def validate_options(o):
         for key, val in o["negative_choice_set"].items()
     )
     assert o["monte_carlo_sequence"] in ["random", "halton", "sobol"]
+    assert o["cache_format"] in ["npy", "parquet"]
+    assert _is_nonnegative_integer(o["cache_max_bytes"])
+    assert isinstance(o["solution_out_of_core"], bool)
+    assert _is_positive_nonzero_integer(o["state_space_n_workers"])
+    assert _is_nonnegative_integer(o["solution_cache_size"])
+    assert not (o["solution_out_of_core"] and o["solution_cache_size"]), (
+        "Solutions cannot be cached in memory if they are out-of-core. Set either "
+        "'solution_cache_size' to 0 or 'solution_out_of_core' to False."
+    )
+    assert o["solution_integration"] in [
+        "monte_carlo",
+        "analytic",
+        "gauss_hermite",
+        "smolyak",
+    ]
+    assert _is_positive_nonzero_integer(o["solution_quadrature_order"])
 
 
 def validate_params(params, optim_paras):
@@ -87,37 +103,36 @@ def check_model_solution(optim_paras, options, state_space):
         [max(choices[choice]["start"]) for choice in optim_paras["choices_w_exp"]]
     )
     n_periods = options["n_periods"]
+    core = state_space.core
 
     # Check period.
-    assert np.all(np.isin(state_space.core.period, range(n_periods)))
+    assert np.all(np.isin(core.period, range(n_periods)))
 
     # The sum of years of experiences cannot be larger than constraint time.
     assert np.all(
-        state_space.core[[f"exp_{c}" for c in optim_paras["choices_w_exp"]]].sum(axis=1)
-        <= (state_space.core.period + max_initial_experience.sum())
+        core[[f"exp_{c}" for c in optim_paras["choices_w_exp"]]].sum(axis=1)
+        <= (core.period + max_initial_experience.sum())
     )
 
     # Choice experience cannot exceed the time frame.
     for choice in optim_paras["choices_w_exp"]:
-        assert state_space.core[f"exp_{choice}"].le(choices[choice]["max"]).all()
+        assert core[f"exp_{choice}"].le(choices[choice]["max"]).all()
 
     # Lagged choices are always in ``range(n_choices)``.
     if optim_paras["n_lagged_choices"]:
         assert np.all(
-            state_space.core.filter(regex=r"\blagged_choice_[0-9]*\b").isin(
-                range(len(choices))
-            )
+            core.filter(regex=r"\blagged_choice_[0-9]*\b").isin(range(len(choices)))
         )
 
-    assert np.all(np.isfinite(state_space.core.select_dtypes(exclude=np.bool)))
+    assert np.all(np.isfinite(core.select_dtypes(exclude=np.bool)))
 
     # Check for duplicate rows in each period. We only have possible duplicates if there
     # are multiple initial conditions.
-    assert not state_space.core.duplicated().any()
+    assert not core.duplicated().any()
 
     # Check that we have as many indices as states.
-    n_valid_indices = len(state_space.indexer)
-    assert state_space.core.shape[0] == n_valid_indices
+    n_valid_indices = state_space.indexer["codes"].shape[0]
+    assert core.shape[0] == n_valid_indices
 
     # Check finiteness of rewards and emaxs.
     finite_wages = _apply_to_attribute_of_state_space(state_space.wages, np.isfinite)
@@ -1,6 +1,8 @@
 """Process model specification files or objects."""
 import copy
+import hashlib
 import itertools
+import json
 import os
 import re
 import warnings
@@ -18,12 +20,15 @@ from respy.config import DEFAULT_OPTIONS
 from respy.config import MAX_FLOAT
 from respy.config import MIN_FLOAT
 from respy.config import SEED_STARTUP_ITERATION_GAP
+from respy.config import STATE_SPACE_CACHE_VERSION
 from respy.pre_processing.model_checking import validate_options
 from respy.pre_processing.model_checking import validate_params
 from respy.pre_processing.process_covariates import remove_irrelevant_covariates
 from respy.pre_processing.process_covariates import (
     separate_covariates_into_core_dense_mixed,
 )
+from respy.pre_processing.process_formulas import Predicate
+from respy.shared import create_run_id
 from respy.shared import normalize_probabilities
 
 warnings.simplefilter("error", category=pd.errors.PerformanceWarning)
@@ -47,6 +52,9 @@ def process_params_and_options(params, options):
     optim_paras = _parse_parameters(params, options)
 
     optim_paras, options = _sync_optim_paras_and_options(optim_paras, options)
+    options["state_space_key"] = _create_state_space_key(optim_paras, options)
+    # Keep the run if the options are processed again, e.g., by a nested function.
+    options["cache_run_id"] = options.get("cache_run_id") or create_run_id()
     validate_params(params, optim_paras)
 
     return optim_paras, options
@@ -729,6 +737,7 @@ def _sync_optim_paras_and_options(optim_paras, options):
     options = _add_type_covariates(options, optim_paras)
     options = _add_default_is_inadmissible(options, optim_paras)
     options = _convert_labels_in_formulas_to_codes(options, optim_paras)
+    options = _compile_choice_restrictions_and_filters(options, optim_paras)
     options = separate_covariates_into_core_dense_mixed(options, optim_paras)
 
     return optim_paras, options
@@ -888,6 +897,117 @@ def _convert_labels_in_filters_to_codes(optim_paras, options):
     return options
 
 
+def _compile_choice_restrictions_and_filters(options, optim_paras):
+    """Compile the formulas of choice restrictions and filters.
+
+    The formulas are compiled once to vectorized predicates which are evaluated while
+    the state space is created. See :mod:`respy.pre_processing.process_formulas`.
+
+    """
+    options["compiled_negative_choice_set"] = {
+        choice: Predicate(options["negative_choice_set"][choice])
+        for choice in optim_paras["choices"]
+    }
+    options["compiled_core_state_space_filters"] = Predicate(
+        options["core_state_space_filters"]
+    )
+
+    return options
+
+
+def create_stage_keys(params, stages):
+    """Create a key for each stage which changes if any input of the stage changes.
+
+    Parameters
+    ----------
+    params : pandas.DataFrame or pandas.Series
+        The parameters of the model.
+    stages : dict
+        Maps stages to a regex matching the categories of their parameters and to the
+        stages they depend on. Stages have to follow the stages they depend on. See
+        :data:`respy.config.SOLUTION_STAGES`.
+
+    Returns
+    -------
+    stage_keys : dict
+        Maps stages to the hash of their parameters and the keys of the stages they
+        depend on.
+
+    Examples
+    --------
+    >>> index = pd.MultiIndex.from_tuples(
+    ...     [("delta", "delta"), ("wage_a", "constant")], names=["category", "name"]
+    ... )
+    >>> params = pd.Series([0.95, 1], index=index)
+    >>> stages = {
+    ...     "rewards": {"categories": "wage_a", "depends_on": []},
+    ...     "solution": {"categories": "delta", "depends_on": ["rewards"]},
+    ... }
+    >>> keys = create_stage_keys(params, stages)
+    >>> params.loc[("delta", "delta")] = 0.9
+    >>> keys_ = create_stage_keys(params, stages)
+    >>> keys["rewards"] == keys_["rewards"], keys["solution"] == keys_["solution"]
+    (True, False)
+
+    """
+    params = _read_params(params)
+    categories = params.index.get_level_values("category")
+
+    stage_keys = {}
+    for stage, attributes in stages.items():
+        inputs = params[categories.str.fullmatch(attributes["categories"])]
+        values = [[*label, value] for label, value in inputs.items()] + [
+            stage_keys[dependency] for dependency in attributes["depends_on"]
+        ]
+        serialized = json.dumps(values, default=str)
+        stage_keys[stage] = hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+    return stage_keys
+
+
+def _create_state_space_key(optim_paras, options):
+    """Create a key which identifies the structure of the state space.
+
+    The key is a hash of all parts of ``optim_paras`` and ``options`` which determine
+    the states, choice sets and covariates of the state space. Parameter values like
+    utility parameters or probabilities do not affect the key. Thus, models with the
+    same structure share the cached state space regardless of their parameter values.
+
+    """
+    structure = {
+        "version": STATE_SPACE_CACHE_VERSION,
+        "cache_format": options["cache_format"],
+        "solution_out_of_core": options["solution_out_of_core"],
+        "n_periods": optim_paras["n_periods"],
+        "choices": [
+            [choice, sorted(attrs.get("start", [])), attrs.get("max")]
+            for choice, attrs in optim_paras["choices"].items()
+        ],
+        "choices_w_wage": optim_paras["choices_w_wage"],
+        "n_lagged_choices": optim_paras["n_lagged_choices"],
+        "observables": [
+            [observable, list(levels)]
+            for observable, levels in optim_paras["observables"].items()
+        ],
+        "exogenous_processes": [
+            [process, list(levels)]
+            for process, levels in optim_paras["exogenous_processes"].items()
+        ],
+        "n_types": optim_paras["n_types"],
+        "covariates": options["covariates"],
+        # Formulas are combined with "or" such that their order and duplicates, e.g.,
+        # from processing the options twice, do not matter.
+        "core_state_space_filters": sorted(set(options["core_state_space_filters"])),
+        "negative_choice_set": {
+            choice: sorted(set(formulas))
+            for choice, formulas in options["negative_choice_set"].items()
+        },
+    }
+    serialized = json.dumps(structure, sort_keys=True, default=str)
+
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+
 def _parse_cache_directory(options):
     """Parse the location of the cache."""
     path = Path(options.get("cache_path", ".respy"))
@@ -160,7 +160,7 @@ def identify_necessary_covariates(dependents, definitions):
                 dependents |= definitions[dependent]["depends_on"]
                 new_dependents |= definitions[dependent]["depends_on"]
             else:
-                dependents.remove(dependent)
+                dependents.discard(dependent)
 
     covariates = {dep: definitions[dep] for dep in dependents}
 
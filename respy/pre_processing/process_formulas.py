@@ -0,0 +1,260 @@
+"""This module comprises all functions which compile formulas of choice restrictions.
+
+Choice restrictions under ``options["negative_choice_set"]`` and filters under
+``options["core_state_space_filters"]`` are written in the syntax of
+:meth:`pandas.DataFrame.eval`. Evaluating them with pandas means that every formula is
+parsed again for every call which is expensive as the formulas are evaluated many
+times while the state space is built.
+
+Instead, the formulas are translated once to vectorized Python expressions which
+operate on NumPy arrays and compiled to bytecode. All formulas of a choice are fused
+into a single expression.
+
+"""
+import ast
+import io
+import sys
+import tokenize
+
+import numpy as np
+
+
+_NAMESPACE = {
+    "__builtins__": {},
+    "_isin": np.isin,
+    "_true": np.True_,
+    "_false": np.False_,
+}
+"""dict : Global namespace in which the compiled formulas are evaluated."""
+
+_CONSTANT_NODES = (
+    (ast.Constant,)
+    if sys.version_info >= (3, 8)
+    else (ast.Num, ast.Str, ast.NameConstant)
+)
+
+_ALLOWED_NODES = _CONSTANT_NODES + (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.List,
+    ast.Tuple,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+)
+
+
+class Predicate:
+    """Vectorized disjunction of formulas.
+
+    The predicate evaluates to true for a state if at least one of the formulas is true.
+    Formulas are translated from the syntax of :meth:`pandas.DataFrame.eval` to
+    expressions on NumPy arrays where ``&``, ``|``, ``and``, ``or``, ``not`` and chained
+    comparisons work element-wise.
+
+    Parameters
+    ----------
+    formulas : list of str
+        Formulas in the syntax of :meth:`pandas.DataFrame.eval`.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({"period": [0, 1, 2, 3], "exp_a": [0, 1, 1, 3]})
+    >>> predicate = Predicate(["period > 0 & exp_a == 0", "0 < exp_a < period"])
+    >>> predicate(df)
+    array([False, False,  True, False])
+
+    Formulas with variables which are not in the DataFrame are skipped if
+    ``skip_undefined`` is true.
+
+    >>> Predicate(["period == 0", "type == 1"])(df, skip_undefined=True)
+    array([ True, False, False, False])
+
+    """
+
+    def __init__(self, formulas):
+        self.formulas = tuple(formulas)
+        self._expressions = [_translate_formula(formula) for formula in self.formulas]
+        self._variables = [_collect_variables(expr) for expr in self._expressions]
+        self._compiled = {}
+
+    def __call__(self, df, skip_undefined=False):
+        """Evaluate the predicate for every row of the DataFrame.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            DataFrame containing the variables used in the formulas.
+        skip_undefined : bool, default False
+            Whether formulas with variables which are not in ``df`` are skipped.
+            Otherwise, a :class:`NameError` is raised.
+
+        Returns
+        -------
+        is_true : numpy.ndarray
+            Boolean array with shape (n_rows,).
+
+        """
+        if skip_undefined:
+            positions = tuple(
+                i
+                for i, variables in enumerate(self._variables)
+                if variables.issubset(df.columns)
+            )
+        else:
+            positions = tuple(range(len(self.formulas)))
+
+        if positions not in self._compiled:
+            self._compiled[positions] = _compile_disjunction(
+                [self._expressions[i] for i in positions]
+            )
+
+        variables = set().union(*[self._variables[i] for i in positions])
+        namespace = {
+            variable: df[variable].to_numpy()
+            for variable in variables
+            if variable in df.columns
+        }
+        is_true = eval(self._compiled[positions], _NAMESPACE, namespace)  # noqa: S307
+
+        return np.broadcast_to(is_true, (df.shape[0],)).astype(np.bool_)
+
+    @property
+    def variables(self):
+        """set : Variables used in the formulas."""
+        return set().union(*self._variables)
+
+    def __reduce__(self):
+        # Bytecode cannot be pickled and is compiled again after unpickling.
+        return Predicate, (self.formulas,)
+
+    def __eq__(self, other):
+        return isinstance(other, Predicate) and self.formulas == other.formulas
+
+    def __hash__(self):
+        return hash(self.formulas)
+
+    def __repr__(self):
+        return f"Predicate({list(self.formulas)})"
+
+
+def _translate_formula(formula):
+    """Translate a formula to an element-wise expression on NumPy arrays.
+
+    Like :meth:`pandas.DataFrame.eval`, ``&`` and ``|`` are replaced with ``and`` and
+    ``or`` so that they bind weaker than comparisons. Afterwards, boolean operators and
+    chained comparisons are replaced with their element-wise counterparts.
+
+    Examples
+    --------
+    >>> expr = _translate_formula("period > 0 & exp_a + exp_b == period")
+    >>> ast.dump(expr.body.op)
+    'BitAnd()'
+
+    """
+    tokens = [
+        (tokenize.NAME, {"&": "and", "|": "or"}[token.string])
+        if token.type == tokenize.OP and token.string in ["&", "|"]
+        else (token.type, token.string)
+        for token in tokenize.generate_tokens(io.StringIO(formula.strip()).readline)
+    ]
+    source = tokenize.untokenize(tokens).strip()
+
+    try:
+        expr = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"The formula '{formula}' is not valid.") from e
+
+    expr = _ElementWiseTransformer().visit(expr)
+
+    for node in ast.walk(expr):
+        if not isinstance(node, _ALLOWED_NODES) or (
+            isinstance(node, ast.Call)
+            and not (isinstance(node.func, ast.Name) and node.func.id == "_isin")
+        ):
+            raise ValueError(
+                f"The formula '{formula}' contains the unsupported expression "
+                f"'{type(node).__name__}'. Use variables, constants, arithmetic, "
+                "comparisons and boolean operators."
+            )
+
+    return ast.fix_missing_locations(expr)
+
+
+class _ElementWiseTransformer(ast.NodeTransformer):
+    """Replace boolean operators and chained comparisons with element-wise ones."""
+
+    def visit_BoolOp(self, node):  # noqa: N802
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        expr = node.values[0]
+        for value in node.values[1:]:
+            expr = ast.BinOp(left=expr, op=op, right=value)
+        return expr
+
+    def visit_UnaryOp(self, node):  # noqa: N802
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            node = ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):  # noqa: N802
+        self.generic_visit(node)
+        comparisons = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                comparison = ast.Call(
+                    func=ast.Name(id="_isin", ctx=ast.Load()),
+                    args=[left, right],
+                    keywords=[],
+                )
+                if isinstance(op, ast.NotIn):
+                    comparison = ast.UnaryOp(op=ast.Invert(), operand=comparison)
+            else:
+                comparison = ast.Compare(left=left, ops=[op], comparators=[right])
+            comparisons.append(comparison)
+            left = right
+
+        expr = comparisons[0]
+        for comparison in comparisons[1:]:
+            expr = ast.BinOp(left=expr, op=ast.BitAnd(), right=comparison)
+        return expr
+
+    def visit_Constant(self, node):  # noqa: N802
+        # Python booleans have to be replaced with NumPy booleans such that ``~``
+        # negates them instead of returning -1 or -2.
+        if isinstance(node.value, bool):
+            node = ast.Name(id="_true" if node.value else "_false", ctx=ast.Load())
+        return node
+
+    visit_NameConstant = visit_Constant  # noqa: N815
+
+
+def _collect_variables(expr):
+    """Collect the variables of an expression."""
+    return {
+        node.id
+        for node in ast.walk(expr)
+        if isinstance(node, ast.Name) and node.id not in _NAMESPACE
+    }
+
+
+def _compile_disjunction(expressions):
+    """Fuse expressions with ``|`` and compile them."""
+    if expressions:
+        body = expressions[0].body
+        for expr in expressions[1:]:
+            body = ast.BinOp(left=body, op=ast.BitOr(), right=expr.body)
+    else:
+        body = ast.Name(id="_false", ctx=ast.Load())
+
+    expr = ast.fix_missing_locations(ast.Expression(body=body))
+
+    return compile(expr, "<formula>", "eval")
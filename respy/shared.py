@@ -4,14 +4,22 @@ This module should only import from other packages or modules of respy which als
 import from respy itself. This is to prevent circular imports.
 
 """
+import atexit
+import collections
+import math
+import mmap
+import os
 import shutil
+import socket
+import uuid
 
 import chaospy as cp
 import numba as nb
 import numpy as np
 import pandas as pd
 
-from respy._numba import array_to_tuple
+from respy.config import DEFAULT_OPTIONS
+from respy.config import INDEXER_INVALID_INDEX
 from respy.config import MAX_LOG_FLOAT
 from respy.config import MIN_LOG_FLOAT
 from respy.parallelization import parallelize_across_dense_dimensions
@@ -127,6 +135,51 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
     return draws
 
 
+def create_base_nodes_and_weights(n_choices, rule, order):
+    """Create nodes and weights of a quadrature rule for standard normal shocks.
+
+    In contrast to the draws of :func:`create_base_draws`, the nodes have weights which
+    sum to one and deterministic quadrature rules need fewer nodes than Monte Carlo
+    integration for the same accuracy if the integrand is smooth. Like draws, the nodes
+    are transformed with :func:`transform_base_draws_with_cholesky_factor`.
+
+    Parameters
+    ----------
+    n_choices : int
+        Number of dimensions of the standard normal distribution.
+    rule : {"gauss_hermite", "smolyak"}
+        Name of the rule. ``"gauss_hermite"`` is the product rule of Gauss-Hermite
+        quadrature in every dimension. ``"smolyak"`` is a sparse grid built from the
+        same one-dimensional rules which has fewer nodes in higher dimensions. As the
+        sparse grid has negative weights, it converges slowly for integrands with kinks
+        like the maximum of value functions.
+    order : int
+        Order of the quadrature rule. The Gauss-Hermite rule has ``order + 1`` nodes per
+        dimension.
+
+    Returns
+    -------
+    nodes : numpy.ndarray
+        Array with shape (n_nodes, n_choices).
+    weights : numpy.ndarray
+        Array with shape (n_nodes,) containing the weights of the nodes. The weights of
+        sparse grids can be negative.
+
+    Examples
+    --------
+    >>> nodes, weights = create_base_nodes_and_weights(2, "gauss_hermite", 2)
+    >>> nodes.shape, weights.sum().round(12)
+    ((9, 2), 1.0)
+
+    """
+    distribution = cp.Iid(cp.Normal(0, 1), n_choices)
+    nodes, weights = cp.generate_quadrature(
+        order, distribution, rule="gaussian", sparse=rule == "smolyak"
+    )
+
+    return nodes.T, weights
+
+
 @parallelize_across_dense_dimensions
 def transform_base_draws_with_cholesky_factor(
     draws, choice_set, shocks_cholesky, optim_paras
@@ -233,6 +286,26 @@ def downcast_to_smallest_dtype(series, downcast_options=None):
     return out
 
 
+def get_smallest_integer_dtype(max_value):
+    """Get the smallest signed integer dtype which can hold values up to ``max_value``.
+
+    Examples
+    --------
+    >>> get_smallest_integer_dtype(127)
+    dtype('int8')
+    >>> get_smallest_integer_dtype(128)
+    dtype('int16')
+
+    """
+    for dtype in [np.int8, np.int16, np.int32]:
+        if max_value <= np.iinfo(dtype).max:
+            break
+    else:
+        dtype = np.int64
+
+    return np.dtype(dtype)
+
+
 def compute_covariates(df, definitions, check_nans=False, raise_errors=True):
     """Compute covariates.
 
@@ -398,6 +471,25 @@ def create_core_state_space_columns(optim_paras):
     ]
 
 
+def create_core_state_space_shape(optim_paras):
+    """Create the number of possible values of each core dimension.
+
+    The dimensions are ordered like the period followed by
+    :func:`create_core_state_space_columns`.
+
+    """
+    n_choices = len(optim_paras["choices"])
+    max_exp = [
+        optim_paras["choices"][choice]["max"] for choice in optim_paras["choices_w_exp"]
+    ]
+
+    return (
+        (optim_paras["n_periods"],)
+        + tuple(int(max_) + 1 for max_ in max_exp)
+        + (n_choices,) * optim_paras["n_lagged_choices"]
+    )
+
+
 def create_dense_state_space_columns(optim_paras):
     """Create internal column names for the dense state space."""
     exogenous_processes = optim_paras["exogenous_processes"]
@@ -432,6 +524,47 @@ def create_state_space_columns(optim_paras):
     ) + create_dense_state_space_columns(optim_paras)
 
 
+@nb.njit
+def calculate_expected_value_function(
+    wages, nonpecs, continuation_values, draws, delta, weights=None
+):
+    """Calculate the expected maximum of value functions of a single state.
+
+    See :func:`calculate_expected_value_functions` for the documentation of the
+    arguments. The function can be called from other compiled functions.
+
+    If ``weights`` with shape (n_draws,) is given, the draws are the nodes of a
+    quadrature rule and the maximum of value functions is averaged with the weights
+    instead of the mean over draws.
+
+    """
+    n_draws, n_choices = draws.shape
+
+    expected_value_function = 0.0
+
+    for i in range(n_draws):
+
+        max_value_functions = 0.0
+
+        for j in range(n_choices):
+            value_function, _ = aggregate_keane_wolpin_utility(
+                wages[j], nonpecs[j], continuation_values[j], draws[i, j], delta
+            )
+
+            if value_function > max_value_functions:
+                max_value_functions = value_function
+
+        if weights is None:
+            expected_value_function += max_value_functions
+        else:
+            expected_value_function += weights[i] * max_value_functions
+
+    if weights is None:
+        expected_value_function /= n_draws
+
+    return expected_value_function
+
+
 @nb.guvectorize(
     ["f8[:], f8[:], f8[:], f8[:, :], f8, f8[:]"],
     "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), () -> ()",
@@ -484,25 +617,137 @@ def calculate_expected_value_functions(
         Expected maximum utility of an agent.
 
     """
-    n_draws, n_choices = draws.shape
+    expected_value_functions[0] = calculate_expected_value_function(
+        wages, nonpecs, continuation_values, draws, delta
+    )
 
-    expected_value_functions[0] = 0
 
-    for i in range(n_draws):
+@nb.njit
+def calculate_analytic_expected_value_function(
+    wages, nonpecs, continuation_values, shocks_cov, n_wages, delta
+):
+    r"""Approximate the expected maximum of value functions of a single state.
+
+    Instead of averaging over draws like :func:`calculate_expected_value_function`, the
+    expected maximum is computed with the moment-matching recursion of [1]_. The maximum
+    of two normally distributed value functions is again approximated by a normal
+    distribution with the exact first two moments of the maximum and its covariances
+    with the remaining value functions. Apart from the bound at zero, the approximation
+    is exact for two normally distributed value functions.
+
+    The shocks of choices without wages enter the value functions additively and the
+    value functions are normally distributed. The shocks of choices with wages enter
+    multiplicatively and the value functions are log-normally distributed. These value
+    functions are replaced by normal distributions with the same means, variances and
+    covariances.
+
+    As in the Monte Carlo integration, the maximum is bounded from below by zero.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_choices,) containing wages.
+    nonpecs : numpy.ndarray
+        Array with shape (n_choices,) containing non-pecuniary rewards.
+    continuation_values : numpy.ndarray
+        Array with shape (n_choices,) containing expected maximum utility for each
+        choice in the subsequent period.
+    shocks_cov : numpy.ndarray
+        Array with shape (n_choices, n_choices) containing the variance-covariance
+        matrix of the shocks.
+    n_wages : int
+        Number of choices with wages which are the first choices.
+    delta : float
+        The discount factor.
 
-        max_value_functions = 0
+    Returns
+    -------
+    expected_value_function : float
+        Expected maximum utility of an agent.
+
+    References
+    ----------
+    .. [1] Clark, C. E. (1961). The greatest of a finite set of random variables.
+           Operations Research, 9(2), 145-162.
 
+    """
+    n_choices = wages.shape[0]
+
+    # Compute the moments of the value functions. For log-normal shocks
+    # :math:`\exp(\epsilon_i)`, :math:`E[\exp(\epsilon_i)] = \exp(\sigma_{ii} / 2)`
+    # and :math:`Cov(\exp(\epsilon_i), \epsilon_j) = E[\exp(\epsilon_i)]
+    # \sigma_{ij}`.
+    scales = wages.copy()
+    means = nonpecs + delta * continuation_values
+    for i in range(n_wages):
+        scales[i] = wages[i] * np.exp(shocks_cov[i, i] / 2)
+        means[i] += scales[i]
+
+    cov = np.empty((n_choices, n_choices))
+    for i in range(n_choices):
         for j in range(n_choices):
-            value_function, _ = aggregate_keane_wolpin_utility(
-                wages[j], nonpecs[j], continuation_values[j], draws[i, j], delta
-            )
+            if i < n_wages and j < n_wages:
+                cov[i, j] = scales[i] * scales[j] * np.expm1(shocks_cov[i, j])
+            else:
+                cov[i, j] = scales[i] * scales[j] * shocks_cov[i, j]
 
-            if value_function > max_value_functions:
-                max_value_functions = value_function
+    mean = means[0]
+    var = cov[0, 0]
+    cov_with_max = cov[0].copy()
+
+    for j in range(1, n_choices):
+        mean, var, prob = _approximate_maximum_of_two_normals(
+            mean, var, means[j], cov[j, j], cov_with_max[j]
+        )
+        for k in range(j + 1, n_choices):
+            cov_with_max[k] = cov_with_max[k] * prob + cov[j, k] * (1 - prob)
 
-        expected_value_functions[0] += max_value_functions
+    expected_value_function, _, _ = _approximate_maximum_of_two_normals(
+        mean, var, 0.0, 0.0, 0.0
+    )
+
+    return expected_value_function
 
-    expected_value_functions[0] /= n_draws
+
+@nb.njit
+def _approximate_maximum_of_two_normals(mean_1, var_1, mean_2, var_2, cov):
+    """Compute the mean and variance of the maximum of two normal random variables.
+
+    Returns
+    -------
+    mean : float
+        Mean of the maximum.
+    var : float
+        Variance of the maximum.
+    prob : float
+        Probability that the first variable is the maximum.
+
+    Examples
+    --------
+    >>> mean, var, prob = _approximate_maximum_of_two_normals(0, 1, 0, 1, 0)
+    >>> round(mean, 4), round(var, 4), prob
+    (0.5642, 0.6817, 0.5)
+
+    """
+    theta = np.sqrt(max(var_1 + var_2 - 2 * cov, 0.0))
+
+    if theta < 1e-12:
+        prob = 1.0 if mean_1 >= mean_2 else 0.0
+        density = 0.0
+    else:
+        alpha = (mean_1 - mean_2) / theta
+        prob = 0.5 * math.erfc(-alpha / np.sqrt(2))
+        density = np.exp(-(alpha ** 2) / 2) / np.sqrt(2 * np.pi)
+
+    mean = mean_1 * prob + mean_2 * (1 - prob) + theta * density
+    second_moment = (
+        (mean_1 ** 2 + var_1) * prob
+        + (mean_2 ** 2 + var_2) * (1 - prob)
+        + (mean_1 + mean_2) * theta * density
+    )
+    var = max(second_moment - mean ** 2, 0.0)
+
+    return mean, var, prob
 
 
 def convert_dictionary_keys_to_dense_indices(dictionary):
@@ -601,7 +846,7 @@ def map_observations_to_states(states, state_space, optim_paras):
         core, state_space.indexer
     )
 
-    if state_space.dense_covariates_to_dense_index:
+    if state_space.dense_covariates_to_dense_index is not None:
         dense_columns = create_dense_state_space_columns(optim_paras)
         dense = states[dense_columns].to_numpy(dtype="int64")
 
@@ -617,16 +862,20 @@ def map_observations_to_states(states, state_space, optim_paras):
     return dense_key, core_index
 
 
-@nb.njit
 def map_states_to_core_key_and_core_index(states, indexer):
     """Map states to the core key and core index.
 
+    The states are encoded as integers with :func:`encode_core_states` and the core key
+    and core index are gathered from the arrays of the indexer. See
+    :func:`respy.state_space._create_indexer` for more information on the indexer.
+
     Parameters
     ----------
     states : numpy.ndarray
         Multidimensional array containing only core dimensions of states.
-    indexer : numba.typed.Dict
-        A dictionary with core states as keys and the core key and core index as values.
+    indexer : dict
+        A dictionary containing the encoded core states and their core keys and core
+        indices.
 
     Returns
     -------
@@ -635,80 +884,626 @@ def map_states_to_core_key_and_core_index(states, indexer):
     core_index : numpy.ndarray
         An array containing the core index. See :ref:`core_indices`.
 
+    Raises
+    ------
+    KeyError
+        If states are not part of the core state space.
+
     """
-    n_states = states.shape[0]
-    core_key = np.zeros(n_states, dtype=np.int64)
-    core_index = np.zeros(n_states, dtype=np.int64)
+    codes = encode_core_states(states, indexer["shape"])
+    core_key, core_index, is_valid = map_codes_to_core_key_and_core_index(
+        codes, indexer
+    )
 
-    for i in range(n_states):
-        core_key_, core_index_ = indexer[array_to_tuple(indexer, states[i])]
-        core_key[i] = core_key_
-        core_index[i] = core_index_
+    if not is_valid.all():
+        raise KeyError(
+            f"The states {states[~is_valid][:5].tolist()} are not part of the core "
+            "state space."
+        )
 
     return core_key, core_index
 
 
-@nb.njit
+def map_codes_to_core_key_and_core_index(codes, indexer):
+    """Map codes of core states to the core key and core index.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        Array of any shape containing codes of core states. See
+        :func:`encode_core_states`.
+    indexer : dict
+        A dictionary containing the encoded core states and their core keys and core
+        indices.
+
+    Returns
+    -------
+    core_key : numpy.ndarray
+        An array with the same shape as ``codes`` containing the core key.
+    core_index : numpy.ndarray
+        An array with the same shape as ``codes`` containing the core index.
+    is_valid : numpy.ndarray
+        A boolean array which is false for codes which are not part of the core state
+        space. Their core key and core index are arbitrary.
+
+    """
+    is_valid = codes != INDEXER_INVALID_INDEX
+
+    if indexer["positions"] is None:
+        positions = np.searchsorted(indexer["codes"], codes)
+        positions = np.clip(positions, 0, indexer["codes"].shape[0] - 1)
+        is_valid &= indexer["codes"][positions] == codes
+    else:
+        positions = indexer["positions"][np.where(is_valid, codes, 0)]
+        is_valid &= positions != INDEXER_INVALID_INDEX
+        positions = np.where(is_valid, positions, 0)
+
+    core_key = indexer["core_key"][positions].astype(np.int64)
+    core_index = indexer["core_index"][positions].astype(np.int64)
+
+    return core_key, core_index, is_valid
+
+
+def encode_core_states(states, shape):
+    """Encode core states as integers with a mixed-radix scheme.
+
+    Each core dimension has a radix which is the number of its possible values. A state
+    is encoded as its position in the array of all possible combinations of values
+    which has the given shape. States with values outside of the shape receive
+    :data:`~respy.config.INDEXER_INVALID_INDEX`.
+
+    Parameters
+    ----------
+    states : numpy.ndarray
+        Array with shape (n_states, n_core_dimensions).
+    shape : tuple of int
+        The number of possible values of each core dimension. See
+        :func:`create_core_state_space_shape`.
+
+    Returns
+    -------
+    codes : numpy.ndarray
+        Array with shape (n_states,) containing the codes of the states.
+
+    Examples
+    --------
+    >>> states = np.array([[0, 0], [1, 2], [2, 1], [3, 0]])
+    >>> encode_core_states(states, (3, 3))
+    array([          0,           5,           7, -2147483648])
+
+    """
+    states = np.asarray(states, dtype=np.int64).reshape(-1, len(shape))
+    is_valid = ((states >= 0) & (states < np.array(shape))).all(axis=1)
+
+    codes = np.full(states.shape[0], INDEXER_INVALID_INDEX, dtype=np.int64)
+    codes[is_valid] = np.ravel_multi_index(states[is_valid].T, shape)
+
+    return codes
+
+
 def _map_observations_to_dense_index(
     dense,
-    core_index,
+    core_key,
     dense_covariates_to_dense_index,
     core_key_and_dense_index_to_dense_key,
 ):
-    n_observations = dense.shape[0]
-    dense_key = np.zeros(n_observations, dtype=np.int64)
+    """Map dense covariates and core keys of observations to dense keys.
 
-    for i in range(n_observations):
-        dense_index = dense_covariates_to_dense_index[
-            array_to_tuple(dense_covariates_to_dense_index, dense[i])
-        ]
-        dense_key_ = core_key_and_dense_index_to_dense_key[(core_index[i], dense_index)]
-        dense_key[i] = dense_key_
+    Both mappings are arrays which are indexed directly with the dense covariates and
+    the core key and dense index, respectively.
+
+    """
+    is_valid = ((dense >= 0) & (dense < dense_covariates_to_dense_index.shape)).all(
+        axis=1
+    )
+    dense_index = np.full(dense.shape[0], INDEXER_INVALID_INDEX, dtype=np.int64)
+    dense_index[is_valid] = dense_covariates_to_dense_index[tuple(dense[is_valid].T)]
+    is_valid &= dense_index != INDEXER_INVALID_INDEX
+
+    dense_key = np.full(dense.shape[0], INDEXER_INVALID_INDEX, dtype=np.int64)
+    dense_key[is_valid] = core_key_and_dense_index_to_dense_key[
+        core_key[is_valid], dense_index[is_valid]
+    ]
+    is_valid &= dense_key != INDEXER_INVALID_INDEX
+
+    if not is_valid.all():
+        raise KeyError(
+            f"The dense states {dense[~is_valid][:5].tolist()} are not part of the "
+            "state space."
+        )
 
     return dense_key
 
 
 def dump_objects(objects, topic, complex_, options):
-    """Dump states."""
-    file_name = _create_file_name_from_complex_index(topic, complex_)
-    objects.to_parquet(
-        options["cache_path"] / file_name, compression=options["cache_compression"],
-    )
+    """Dump objects to the cache.
+
+    With ``options["cache_format"] == "npy"``, the objects are stored as a single
+    ``.npy`` file which can be memory-mapped. DataFrames with columns which are not
+    numeric and all objects with ``options["cache_format"] == "parquet"`` are stored as
+    parquet files.
+
+    """
+    directory = _get_directory_of_topic(topic, options, create=True)
+    name = _create_file_name_from_complex_index(topic, complex_)
+
+    is_numeric = all(dtype.kind in "biuf" for dtype in objects.dtypes)
+    if options["cache_format"] == "npy" and is_numeric:
+        _replace_file(directory / f"{name}.npy", lambda file: _dump_npy(objects, file))
+    else:
+        objects.to_parquet(
+            directory / f"{name}.parquet", compression=options["cache_compression"]
+        )
+
+    _OBJECT_CACHE.max_bytes = options["cache_max_bytes"]
+    _OBJECT_CACHE.put((directory, topic, complex_), objects.copy(deep=False))
 
 
 def load_objects(topic, complex_, options):
-    """Load states."""
-    file_name = _create_file_name_from_complex_index(topic, complex_)
-    directory = options["cache_path"]
-    return pd.read_parquet(directory / file_name)
+    """Load objects from the cache.
+
+    Objects are kept in memory by an LRU cache whose size is limited by
+    ``options["cache_max_bytes"]``. Only if the objects are not in memory, they are
+    loaded from disk.
+
+    Objects stored in ``.npy`` files are memory-mapped and not copied. Thus, repeated
+    loads and multiple processes share the same pages, but the columns are read-only.
+
+    """
+    directory = _get_directory_of_topic(topic, options)
+    _OBJECT_CACHE.max_bytes = options["cache_max_bytes"]
+    objects = _OBJECT_CACHE.get((directory, topic, complex_))
+
+    if objects is None:
+        name = _create_file_name_from_complex_index(topic, complex_)
+        path = directory / f"{name}.npy"
+        if options["cache_format"] == "npy" and path.exists():
+            objects = _load_npy(path)
+        else:
+            objects = pd.read_parquet(directory / f"{name}.parquet")
+        _OBJECT_CACHE.put((directory, topic, complex_), objects)
+
+    # A shallow copy prevents that callers add columns to the cached objects.
+    objects = objects.copy(deep=False)
+
+    return objects
+
+
+def load_states(core_complex, dense_variables, options, covariates=None):
+    """Load the states of a dense key.
+
+    The states of a core key are stored once and shared by all dense keys with the same
+    core key. The values of the dense dimensions and dense covariates are joined to the
+    loaded core states and covariates which depend on core and dense information are
+    computed.
+
+    Parameters
+    ----------
+    core_complex : tuple
+        The complex of the core key of the dense key. See :ref:`complex`.
+    dense_variables : dict
+        Maps the names of dense dimensions and dense covariates to their values.
+    options : dict
+        Contains model options.
+    covariates : dict, optional
+        Definitions of the covariates which are computed. By default, all covariates in
+        ``options["covariates_all"]``.
+
+    Returns
+    -------
+    states : pandas.DataFrame
+
+    """
+    states = load_objects("states", core_complex, options)
+
+    if dense_variables:
+        for column, value in dense_variables.items():
+            states[column] = value
+        covariates = options["covariates_all"] if covariates is None else covariates
+        states = compute_covariates(states, covariates)
+
+    return states
+
+
+class _ObjectCache:
+    """LRU cache for objects loaded from disk whose size is limited in bytes.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum number of bytes of all cached objects. Use 0 to disable the cache.
+
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._objects = collections.OrderedDict()
+
+    def get(self, key):
+        """Get objects and mark them as recently used or return None."""
+        if key in self._objects:
+            self._objects.move_to_end(key)
+            self.hits += 1
+            objects = self._objects[key][0]
+        else:
+            self.misses += 1
+            objects = None
+
+        return objects
+
+    def put(self, key, objects):
+        """Put objects in the cache and evict the least recently used objects."""
+        self._discard(key)
+
+        n_bytes = int(objects.memory_usage(index=True, deep=False).sum())
+        if n_bytes <= self.max_bytes:
+            self._objects[key] = (objects, n_bytes)
+            self.n_bytes += n_bytes
+
+        while self.n_bytes > self.max_bytes:
+            self._discard(next(iter(self._objects)))
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all objects and reset the counters."""
+        self.__init__(self.max_bytes)
+
+    def _discard(self, key):
+        if key in self._objects:
+            self.n_bytes -= self._objects.pop(key)[1]
+
+
+_OBJECT_CACHE = _ObjectCache(DEFAULT_OPTIONS["cache_max_bytes"])
+"""_ObjectCache : Cache of objects loaded from disk by this process."""
+
+
+def get_object_cache_info():
+    """Get information on the in-memory cache of objects loaded from disk.
+
+    The cache sits in front of :func:`load_objects` and is shared by all models in the
+    process. Use the information to tune ``options["cache_max_bytes"]``.
+
+    Returns
+    -------
+    info : dict
+        Dictionary with the number of ``"hits"``, ``"misses"``, and ``"evictions"``,
+        the number of cached objects, ``"n_objects"``, their size, ``"n_bytes"``, and
+        the limit ``"max_bytes"``.
+
+    """
+    return {
+        "hits": _OBJECT_CACHE.hits,
+        "misses": _OBJECT_CACHE.misses,
+        "evictions": _OBJECT_CACHE.evictions,
+        "n_objects": len(_OBJECT_CACHE._objects),
+        "n_bytes": _OBJECT_CACHE.n_bytes,
+        "max_bytes": _OBJECT_CACHE.max_bytes,
+    }
+
+
+def clear_object_cache():
+    """Clear the in-memory cache of objects loaded from disk and reset its counters."""
+    _OBJECT_CACHE.clear()
+
+
+_NPY_INDEX = "__index__"
+"""str : Name of the field which stores the index of a DataFrame in a ``.npy`` file."""
+
+_NPY_ALIGNMENT = 64
+"""int : Alignment of the columns of a DataFrame in a ``.npy`` file in bytes."""
+
+_NPY_MEMORY_MAPS = {}
+"""dict : Status and memory map of every ``.npy`` file loaded by this process."""
+
+
+def _dump_npy(df, file):
+    """Dump a DataFrame to a ``.npy`` file.
+
+    The file contains a single record of a structured array. Every field is one column
+    of the DataFrame which is stored as a contiguous and aligned sub-array. Thus, the
+    columns are memory-mapped with a single header and can be used without a copy.
+
+    """
+    arrays = {_NPY_INDEX: df.index.to_numpy()}
+    arrays.update({column: df[column].to_numpy() for column in df.columns})
+
+    offsets = []
+    offset = 0
+    for array in arrays.values():
+        offset = -(-offset // _NPY_ALIGNMENT) * _NPY_ALIGNMENT
+        offsets.append(offset)
+        offset += array.nbytes
+
+    dtype = np.dtype(
+        {
+            "names": list(arrays),
+            "formats": [(array.dtype, array.shape) for array in arrays.values()],
+            "offsets": offsets,
+            "itemsize": max(-(-offset // _NPY_ALIGNMENT) * _NPY_ALIGNMENT, 1),
+        }
+    )
+    record = np.zeros(1, dtype=dtype)
+    for name, array in arrays.items():
+        record[name][0] = array
+
+    # Version 3.0 of the format skips a slow compatibility step when reading headers.
+    np.lib.format.write_array(file, record, version=(3, 0))
+
+
+def _load_npy(path):
+    """Load a DataFrame from a memory-mapped ``.npy`` file.
+
+    The memory maps are kept per process such that the header of a file is only read
+    once. Files are identified by their path and their status which changes if a file is
+    replaced.
+
+    """
+    stat = path.stat()
+    status = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _NPY_MEMORY_MAPS.get(path, (None,))[0] != status:
+        _NPY_MEMORY_MAPS[path] = (status, np.load(path, mmap_mode="r"))
+    record = _NPY_MEMORY_MAPS[path][1]
+
+    index = pd.Index(record[_NPY_INDEX][0])
+    data = {name: record[name][0] for name in record.dtype.names[1:]}
+
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def _replace_file(path, write):
+    """Write a file to a temporary path and replace the file atomically.
+
+    Memory maps of the previous version of the file remain valid.
+
+    """
+    temporary_path = path.with_name(f"{path.name}.tmp")
+    with open(temporary_path, "wb") as file:
+        write(file)
+    os.replace(temporary_path, path)
+
+
+def create_memory_map(array, topic, complex_, options):
+    """Copy an array to a file and return a memory map of the file.
+
+    Memory maps are used if ``options["solution_out_of_core"]`` is true. The operating
+    system pages the arrays in if they are accessed and can page them out under memory
+    pressure. Thus, models with more states than fit into memory can be solved.
+
+    Parameters
+    ----------
+    array : numpy.ndarray
+        The array which is copied to the file.
+    topic : str
+        Topic of the array like ``"wages"``. The topics in ``_STRUCTURAL_TOPICS`` are
+        stored in the cache of the state space and all others in the run directory.
+    complex_ : tuple
+        See :ref:`complex`.
+    options : dict
+
+    Returns
+    -------
+    memory_map : numpy.memmap
+        Memory map of the file which can be read and written.
+
+    """
+    directory = _get_directory_of_topic(topic, options, create=True)
+    name = _create_file_name_from_complex_index(topic, complex_)
+
+    memory_map = np.lib.format.open_memmap(
+        directory / f"{name}.npy", mode="w+", dtype=array.dtype, shape=array.shape
+    )
+    memory_map[:] = array
+
+    return memory_map
+
+
+def load_memory_map(topic, complex_, options):
+    """Load a read-only memory map created with :func:`create_memory_map`."""
+    directory = _get_directory_of_topic(topic, options)
+    name = _create_file_name_from_complex_index(topic, complex_)
+
+    return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+
+def release_memory_map(array):
+    """Write the changes of a memory map to disk and release its pages.
+
+    Nothing happens if the array is not a memory map.
+
+    """
+    if isinstance(array, np.memmap):
+        array.flush()
+        # Released pages of a file-backed map are read again from disk if necessary.
+        if array._mmap is not None and hasattr(mmap, "MADV_DONTNEED"):
+            array._mmap.madvise(mmap.MADV_DONTNEED)
+
+
+def prefetch_memory_map(array):
+    """Ask the operating system to read the pages of a memory map in the background.
+
+    The call returns immediately and the pages are read asynchronously such that they
+    are in memory when the array is accessed. Nothing happens if the array is not a
+    memory map.
+
+    """
+    if isinstance(array, np.memmap):
+        if array._mmap is not None and hasattr(mmap, "MADV_WILLNEED"):
+            array._mmap.madvise(mmap.MADV_WILLNEED)
+
+
+_STRUCTURAL_TOPICS = ["states", "child_indices"]
+"""list : Topics which belong to the structure of the model and are shared by runs."""
+
+
+def _get_directory_of_topic(topic, options, create=False):
+    """Get the directory of a topic.
+
+    States and child indices belong to the structure of the model and are shared by all
+    runs whereas other objects like transition probabilities depend on parameters and
+    belong to the run.
+
+    """
+    if topic in _STRUCTURAL_TOPICS:
+        directory = get_cache_directory(options)
+    else:
+        directory = get_run_directory(options, create)
+
+    return directory
 
 
 def _create_file_name_from_complex_index(topic, complex_):
     """Create a file name from a complex index."""
     choice = "".join([str(int(x)) for x in complex_[1]])
     if len(complex_) == 3:
-        file_name = f"{topic}_{complex_[0]}_{choice}_{complex_[2]}.parquet"
+        file_name = f"{topic}_{complex_[0]}_{choice}_{complex_[2]}"
     elif len(complex_) == 2:
-        file_name = f"{topic}_{complex_[0]}_{choice}.parquet"
+        file_name = f"{topic}_{complex_[0]}_{choice}"
     else:
         raise NotImplementedError
 
     return file_name
 
 
+def get_cache_directory(options):
+    """Get the cache directory of the state space.
+
+    The state space of a model is cached in a sub-directory of ``options["cache_path"]``
+    which is named after the key of the model structure. Thus, models with the same
+    structure share the cache.
+
+    """
+    return options["cache_path"] / options["state_space_key"]
+
+
+def create_run_id():
+    """Create the identifier of a run.
+
+    The identifier contains the host name and the process id such that directories of
+    runs which were not cleaned up because the process was killed can be identified.
+
+    """
+    return f"{socket.gethostname()}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+
+def get_run_directory(options, create=False):
+    """Get the directory of a run.
+
+    Every function returned by :func:`~respy.solve.get_solve_func`,
+    :func:`~respy.simulate.get_simulate_func` and
+    :func:`~respy.likelihood.get_log_like_func` has its own run in which objects
+    depending on parameters are stored. Thus, multiple processes which use the same
+    cache do not overwrite their objects.
+
+    The directory is created on demand and removed when the process exits.
+
+    The run identifier in ``options["cache_run_id"]`` belongs to the process which
+    processed the options. Other processes, e.g., processes forked to evaluate the
+    criterion function in parallel, inherit the options and would share the directory.
+    Thus, every process uses its own run which is derived from the identifier with
+    :func:`_get_run_id_of_process`.
+
+    """
+    run_id = _get_run_id_of_process(options["cache_run_id"])
+    directory = options["cache_path"] / "runs" / run_id
+
+    if create and directory not in _RUN_DIRECTORIES:
+        _remove_directories_of_terminated_runs(directory.parent)
+        directory.mkdir(parents=True, exist_ok=True)
+        _RUN_DIRECTORIES.add(directory)
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+
+    return directory
+
+
+_RUN_DIRECTORIES = set()
+"""set : Directories of runs created by this process."""
+
+
+def _get_run_id_of_process(run_id):
+    """Get the identifier of a run for the current process.
+
+    Identifiers created by :func:`create_run_id` contain the host name and the process
+    id. If the identifier belongs to another process, the host name and process id are
+    replaced with the ones of the current process.
+
+    Examples
+    --------
+    >>> run_id = create_run_id()
+    >>> _get_run_id_of_process(run_id) == run_id
+    True
+    >>> _get_run_id_of_process("host_1_a1b2c3d4") == run_id
+    False
+
+    """
+    host, pid, suffix = (["", "", ""] + run_id.rsplit("_", 2))[-3:]
+
+    if host == socket.gethostname() and pid == str(os.getpid()):
+        run_id_of_process = run_id
+    else:
+        run_id_of_process = f"{socket.gethostname()}_{os.getpid()}_{suffix}"
+
+    return run_id_of_process
+
+
+def _remove_directories_of_terminated_runs(directory):
+    """Remove directories of runs on this host whose process does not exist anymore."""
+    if os.name != "posix" or not directory.exists():
+        return
+
+    for path in directory.iterdir():
+        host, pid, _ = (["", "", ""] + path.name.rsplit("_", 2))[-3:]
+        if (
+            host == socket.gethostname()
+            and pid.isdigit()
+            and not _is_process_alive(int(pid))
+        ):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _is_process_alive(pid):
+    """Check whether a process is alive."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        is_alive = False
+    except PermissionError:
+        is_alive = True
+    else:
+        is_alive = True
+
+    return is_alive
+
+
 def prepare_cache_directory(options):
-    """Prepare cache directory.
+    """Prepare the directory in which the state space is built.
 
-    The directory contains the parts of the state space.
+    The state space is built in a directory of the run and published afterwards. Thus,
+    processes which build the same state space at the same time do not interfere and
+    other processes never see an incomplete state space.
+
+    Returns
+    -------
+    build_options : dict
+        The options which point to the directory in which the state space is built.
 
     """
-    directory = options["cache_path"]
+    run_directory = get_run_directory(options, create=True)
+    build_options = {
+        **options,
+        "state_space_key": run_directory.relative_to(options["cache_path"])
+        / options["state_space_key"],
+    }
+    directory = get_cache_directory(build_options)
     if directory.exists():
         shutil.rmtree(directory)
 
-    directory.mkdir(parents=True, exist_ok=True)
+    directory.mkdir(parents=True)
 
-    return directory
+    return build_options
 
 
 def select_valid_choices(choices, choice_set):
@@ -1,19 +1,28 @@
 """Everything related to the solution of a structural model."""
 import functools
 
+import numba as nb
 import numpy as np
+import pandas as pd
 
+from respy.config import SOLUTION_STAGES
 from respy.exogenous_processes import compute_transition_probabilities
 from respy.interpolate import kw_94_interpolation
 from respy.parallelization import parallelize_across_dense_dimensions
+from respy.pre_processing.model_processing import create_stage_keys
 from respy.pre_processing.model_processing import process_params_and_options
-from respy.shared import calculate_expected_value_functions
+from respy.shared import calculate_analytic_expected_value_function
+from respy.shared import calculate_expected_value_function
+from respy.shared import create_memory_map
 from respy.shared import dump_objects
-from respy.shared import load_objects
-from respy.shared import pandas_dot
-from respy.shared import select_valid_choices
+from respy.shared import load_states
+from respy.shared import prefetch_memory_map
+from respy.shared import release_memory_map
+from respy.shared import subset_cholesky_factor_to_choice_set
 from respy.shared import transform_base_draws_with_cholesky_factor
+from respy.state_space import create_reward_covariate_labels
 from respy.state_space import create_state_space_class
+from respy.state_space import create_state_space_size
 
 
 def get_solve_func(params, options):
@@ -51,84 +60,533 @@ def get_solve_func(params, options):
     return solve_function
 
 
+def get_batch_solve_func(params, options):
+    """Get the function which solves the model for a batch of parameter vectors.
+
+    All parameter vectors of a batch share the structure of the model given by
+    ``params`` and ``options``.
+
+    Parameters
+    ----------
+    params : pandas.DataFrame
+        DataFrame containing parameter series.
+    options : dict
+        Dictionary containing model attributes which are not optimized.
+
+    Returns
+    -------
+    solve_batch : :func:`~respy.solve.solve_batch`
+        Function with partialed arguments.
+
+    Examples
+    --------
+    >>> import respy as rp
+    >>> params, options = rp.get_example_model("robinson_crusoe_basic", with_data=False)
+    >>> solve_batch = rp.get_batch_solve_func(params, options)
+    >>> other_params = params.copy()
+    >>> other_params.loc[("delta", "delta"), "value"] = 0.9
+    >>> solutions = solve_batch([params, other_params])
+    >>> len(solutions)
+    2
+
+    """
+    optim_paras, options = process_params_and_options(params, options)
+
+    state_space = create_state_space_class(optim_paras, options)
+    solve_function = functools.partial(
+        solve_batch, options=options, state_space=state_space
+    )
+
+    return solve_function
+
+
+def get_state_space_size(params, options):
+    """Get the size of the state space and the projected memory of the solution.
+
+    The state space is not created. Only the core state space is enumerated and the
+    choice restrictions and filters are applied to it such that the function is much
+    faster than :func:`get_solve_func` and needs only a fraction of its memory. Use it
+    to size machines and the number of interpolation points.
+
+    Parameters
+    ----------
+    params : pandas.DataFrame
+        DataFrame containing parameter series.
+    options : dict
+        Dictionary containing model attributes which are not optimized.
+
+    Returns
+    -------
+    size : pandas.DataFrame
+        DataFrame indexed by period with the number of states, ``"n_states"``, and
+        dense keys, ``"n_dense_keys"``. The other columns contain the projected number
+        of bytes of the child indices, wages, non-pecuniary rewards, reward covariates,
+        draws and expected value functions.
+
+    Examples
+    --------
+    >>> import respy as rp
+    >>> params, options = rp.get_example_model("robinson_crusoe_basic", with_data=False)
+    >>> size = rp.get_state_space_size(params, options)
+    >>> size["n_states"].sum()
+    15
+
+    """
+    optim_paras, options = process_params_and_options(params, options)
+
+    return create_state_space_size(optim_paras, options)
+
+
 def solve(params, options, state_space):
-    """Solve the model."""
+    """Solve the model.
+
+    The solution is split into the stages in :data:`~respy.config.SOLUTION_STAGES`. A
+    stage is skipped if none of its inputs has changed since the previous solution with
+    the same state space. For example, changing only type probabilities does not trigger
+    a new solution.
+
+    If ``options["solution_cache_size"]`` is positive, the most recently used solutions
+    are kept in memory and restored if the parameters of the solution are repeated.
+
+    """
     optim_paras, options = process_params_and_options(params, options)
 
-    transit_keys = None
-    if hasattr(state_space, "dense_key_to_transit_keys"):
-        transit_keys = state_space.dense_key_to_transit_keys
+    stage_keys = create_stage_keys(params, SOLUTION_STAGES)
+    if options["solution_cache_size"]:
+        _restore_solution_from_cache(state_space, stage_keys)
+
+    is_outdated = {
+        stage: key != state_space.stage_keys.get(stage)
+        for stage, key in stage_keys.items()
+    }
+    # Interrupted solutions are repeated completely.
+    state_space.stage_keys = {}
+
+    if is_outdated["rewards"]:
+        wages, nonpecs = _create_rewards(state_space, [optim_paras], options)
+        state_space.wages = {key: value[0] for key, value in wages.items()}
+        state_space.nonpecs = {key: value[0] for key, value in nonpecs.items()}
+
+    if is_outdated["transitions"] and optim_paras["exogenous_processes"]:
+        _create_transition_probabilities(
+            state_space.dense_key_to_complex,
+            state_space.dense_key_to_core_complex,
+            state_space.dense_key_to_dense_variables,
+            optim_paras,
+            options,
+            transit_keys=state_space.dense_key_to_transit_keys,
+            bypass={
+                "dense_key_to_dense_covariates": (
+                    state_space.dense_key_to_dense_covariates
+                )
+            },
+        )
+
+    # Without draws, all expected value functions are computed analytically.
+    if not state_space.base_draws_sol:
+        state_space.draws_emax_risk = {}
+    elif is_outdated["draws"]:
+        state_space.draws_emax_risk = transform_base_draws_with_cholesky_factor(
+            state_space.base_draws_sol,
+            state_space.dense_key_to_choice_set,
+            optim_paras["shocks_cholesky"],
+            optim_paras,
+        )
+
+    if is_outdated["expected_value_functions"]:
+        state_space = _solve_with_backward_induction(state_space, optim_paras, options)
+
+    state_space.stage_keys = stage_keys
+    if options["solution_cache_size"]:
+        _add_solution_to_cache(state_space, options["solution_cache_size"])
+
+    return state_space
+
+
+def solve_batch(params_batch, options, state_space):
+    """Solve the model for a batch of parameter vectors which share the state space.
+
+    The rewards of all parameter vectors are computed with one matrix product per dense
+    key and the expected value functions of all parameter vectors with one kernel per
+    period. Thus, the states, child indices and the offsets of states are loaded and
+    computed once for the whole batch.
+
+    Models with exogenous processes, interpolation or analytic expected value functions
+    are solved for one parameter vector after another. Otherwise, the rewards of the
+    batch are kept in memory even if ``options["solution_out_of_core"]`` is true. The
+    returned solutions are always in memory.
+
+    Parameters
+    ----------
+    params_batch : list or pandas.DataFrame
+        A list of parameter vectors or a DataFrame with the index of ``params`` and one
+        column per parameter vector. All parameter vectors need the same covariates in
+        the reward functions.
+    options : dict
+        Dictionary containing model attributes which are not optimized.
+    state_space : :class:`~respy.state_space.StateSpace`
+        The state space shared by the batch.
+
+    Returns
+    -------
+    solutions : list of dict
+        For each parameter vector, a dictionary with the ``"wages"``, ``"nonpecs"`` and
+        ``"expected_value_functions"`` of each dense key.
+
+    """
+    if isinstance(params_batch, pd.DataFrame):
+        params_batch = [params_batch[column] for column in params_batch]
+
+    optim_paras_batch = [
+        process_params_and_options(params, options)[0] for params in params_batch
+    ]
+    _, processed_options = process_params_and_options(params_batch[0], options)
+
+    labels = set(create_reward_covariate_labels(optim_paras_batch[0]))
+    if any(
+        set(create_reward_covariate_labels(optim_paras)) != labels
+        for optim_paras in optim_paras_batch
+    ):
+        raise ValueError(
+            "All parameter vectors of a batch need the same covariates in the reward "
+            "functions."
+        )
+
+    is_interpolated = any(
+        state_space.is_period_interpolated(period, processed_options)
+        for period in range(processed_options["n_periods"])
+    )
 
-    wages, nonpecs = _create_param_specific_objects(
+    if (
+        optim_paras_batch[0]["exogenous_processes"]
+        or is_interpolated
+        or processed_options["solution_integration"] == "analytic"
+    ):
+        solutions = []
+        for params in params_batch:
+            state_space = solve(params, options, state_space)
+            solutions.append(
+                {
+                    "wages": {
+                        k: _copy_memory_map(v) for k, v in state_space.wages.items()
+                    },
+                    "nonpecs": {
+                        k: _copy_memory_map(v) for k, v in state_space.nonpecs.items()
+                    },
+                    "expected_value_functions": {
+                        k: np.array(v)
+                        for k, v in state_space.expected_value_functions.items()
+                    },
+                }
+            )
+
+    else:
+        # The rewards of a batch are kept in memory. Memory maps would share the files
+        # of the rewards of the state space and be returned to the caller.
+        processed_options = {**processed_options, "solution_out_of_core": False}
+        wages, nonpecs = _create_rewards(
+            state_space, optim_paras_batch, processed_options
+        )
+
+        draws_emax_risk_batch = [
+            transform_base_draws_with_cholesky_factor(
+                state_space.base_draws_sol,
+                state_space.dense_key_to_choice_set,
+                optim_paras["shocks_cholesky"],
+                optim_paras,
+            )
+            for optim_paras in optim_paras_batch
+        ]
+        draws_emax_risk = {
+            key: np.stack([draws[key] for draws in draws_emax_risk_batch])
+            for key in draws_emax_risk_batch[0]
+        }
+        delta = np.array(
+            [optim_paras["delta"] for optim_paras in optim_paras_batch],
+            dtype=np.float64,
+        )
+
+        expected_value_functions = _solve_batch_with_backward_induction(
+            state_space, wages, nonpecs, draws_emax_risk, delta, processed_options
+        )
+
+        solutions = [
+            {
+                "wages": {k: v[i] for k, v in wages.items()},
+                "nonpecs": {k: v[i] for k, v in nonpecs.items()},
+                "expected_value_functions": {
+                    k: v[i] for k, v in expected_value_functions.items()
+                },
+            }
+            for i in range(len(optim_paras_batch))
+        ]
+
+    return solutions
+
+
+def _solve_batch_with_backward_induction(
+    state_space, wages, nonpecs, draws_emax_risk, delta, options
+):
+    """Calculate the expected value functions of a batch with backward induction.
+
+    See :func:`_solve_with_backward_induction` for a single parameter vector. All
+    arrays have a leading axis for the parameter vectors.
+
+    Returns
+    -------
+    expected_value_functions : dict
+        Maps dense keys to arrays with shape (n_params, n_states).
+
+    """
+    n_periods = options["n_periods"]
+
+    expected_value_functions = {}
+    for period in reversed(range(n_periods)):
+        dense_keys_in_period = state_space.get_dense_keys_from_period(period)
+
+        if period == n_periods - 1:
+            continuation_values = {
+                key: np.zeros(wages[key].shape) for key in dense_keys_in_period
+            }
+        else:
+            continuation_values = state_space.get_continuation_values(
+                period,
+                {
+                    key: expected_value_functions[key]
+                    for key in state_space.get_dense_keys_from_period(period + 1)
+                },
+            )
+
+        period_expected_value_functions = _full_solution_of_batch(
+            *[
+                {key: x[key] for key in dense_keys_in_period}
+                for x in [wages, nonpecs, continuation_values, draws_emax_risk]
+            ],
+            delta,
+            _get_period_weights(state_space, period),
+            options["solution_out_of_core"],
+        )
+
+        # Expected value functions of myopic individuals are zero.
+        for value in period_expected_value_functions.values():
+            value[delta == 0] = 0
+
+        expected_value_functions.update(period_expected_value_functions)
+
+    return expected_value_functions
+
+
+def _restore_solution_from_cache(state_space, stage_keys):
+    """Restore a cached solution with the same expected value functions.
+
+    The state space receives copies such that the cached solution is not changed by
+    later solutions.
+
+    Transition probabilities are stored on disk and not cached. Thus, the key of the
+    current transition probabilities is kept such that they are created again if they
+    belong to other parameters.
+
+    """
+    key = stage_keys["expected_value_functions"]
+    is_solved = key == state_space.stage_keys.get("expected_value_functions")
+
+    if key in state_space.solution_cache and not is_solved:
+        state_space.solution_cache.move_to_end(key)
+        solution = state_space.solution_cache[key]
+
+        state_space.wages = {k: v.copy() for k, v in solution["wages"].items()}
+        state_space.nonpecs = {k: v.copy() for k, v in solution["nonpecs"].items()}
+        state_space.draws_emax_risk = {
+            k: v.copy() for k, v in solution["draws_emax_risk"].items()
+        }
+        state_space.set_attribute_from_keys(
+            "expected_value_functions", solution["expected_value_functions"]
+        )
+        state_space.stage_keys = {
+            **solution["stage_keys"],
+            "transitions": state_space.stage_keys.get("transitions"),
+        }
+
+
+def _add_solution_to_cache(state_space, cache_size):
+    """Add the solution to the cache and evict the least recently used solutions.
+
+    Expected value functions are changed in-place by the next solution. Thus, they are
+    copied. The cache is not available for solutions out-of-core, see
+    :func:`~respy.pre_processing.model_checking.validate_options`.
+
+    """
+    key = state_space.stage_keys["expected_value_functions"]
+
+    if key in state_space.solution_cache:
+        state_space.solution_cache.move_to_end(key)
+    else:
+        state_space.solution_cache[key] = {
+            "wages": state_space.wages,
+            "nonpecs": state_space.nonpecs,
+            "draws_emax_risk": state_space.draws_emax_risk,
+            "expected_value_functions": {
+                k: np.array(v) for k, v in state_space.expected_value_functions.items()
+            },
+            "stage_keys": state_space.stage_keys,
+        }
+
+    while len(state_space.solution_cache) > cache_size:
+        state_space.solution_cache.popitem(last=False)
+
+
+def _copy_memory_map(array):
+    """Copy a memory map into memory and return other arrays unchanged."""
+    return np.array(array) if isinstance(array, np.memmap) else array
+
+
+def _create_rewards(state_space, optim_paras_batch, options):
+    """Create the wages and non-pecuniary rewards of all dense keys.
+
+    The rewards have a leading axis for the parameter vectors in ``optim_paras_batch``
+    which share the labels of the reward covariates.
+
+    """
+    labels = create_reward_covariate_labels(optim_paras_batch[0])
+    reward_covariates = getattr(state_space, "reward_covariates", None)
+    if reward_covariates is None or not set(labels) <= set(
+        reward_covariates["core"] + reward_covariates["dense"]
+    ):
+        state_space.create_reward_covariates(optim_paras_batch[0])
+
+    coefficients = {
+        topic: np.stack(
+            [
+                _create_reward_coefficients(labels_, optim_paras)
+                for optim_paras in optim_paras_batch
+            ]
+        )
+        for topic, labels_ in state_space.reward_covariates.items()
+    }
+
+    wages, nonpecs = _create_rewards_of_dense_key(
         state_space.dense_key_to_complex,
         state_space.dense_key_to_choice_set,
-        optim_paras,
-        options,
-        transit_keys=transit_keys,
-        bypass={
-            "dense_key_to_dense_covariates": state_space.dense_key_to_dense_covariates
+        {
+            key: state_space.core_key_to_reward_covariates[core_key]
+            for key, core_key in state_space.dense_key_to_core_key.items()
         },
+        state_space.dense_key_to_reward_covariates,
+        coefficients,
+        options,
     )
 
-    state_space.wages = wages
-    state_space.nonpecs = nonpecs
+    return wages, nonpecs
 
-    state_space = _solve_with_backward_induction(state_space, optim_paras, options)
 
-    return state_space
+@parallelize_across_dense_dimensions
+def _create_rewards_of_dense_key(
+    complex_, choice_set, core_covariates, dense_covariates, coefficients, options
+):
+    """Create the rewards of a dense key which are kept in memory or memory maps."""
+    wages, nonpecs = _create_choice_rewards(
+        core_covariates, dense_covariates, coefficients, choice_set
+    )
+
+    if options["solution_out_of_core"]:
+        wages = create_memory_map(wages, "wages", complex_, options)
+        nonpecs = create_memory_map(nonpecs, "nonpecs", complex_, options)
+
+    return wages, nonpecs
 
 
 @parallelize_across_dense_dimensions
-def _create_param_specific_objects(
+def _create_transition_probabilities(
     complex_,
-    choice_set,
+    core_complex,
+    dense_variables,
     optim_paras,
     options,
     dense_key_to_dense_covariates,
     transit_keys=None,
 ):
-    """Create param specific objects.
+    """Create the transition probabilities of exogenous processes.
+
+    The transition probabilities are dumped to disk and loaded during the backward
+    induction.
 
-    This function creates objects that are not fixed for a given model.
-    Depending on their size they are either kept in working memory such
-    as wages or dumped on disk such as transition probabilities!
-    In the medium run we could also allow for fixed params here by saving values
-    on disk directly!
-    For objects that we store on disk we will just return the prefix of the location.
     """
-    states = load_objects("states", complex_, options)
-    wages, nonpecs = _create_choice_rewards(states, choice_set, optim_paras)
+    states = load_states(core_complex, dense_variables, options)
+    transition_probabilities = compute_transition_probabilities(
+        states, transit_keys, optim_paras, dense_key_to_dense_covariates
+    )
+    dump_objects(transition_probabilities, "transition", complex_, options)
 
-    if optim_paras["exogenous_processes"]:
-        transition_probabilities = compute_transition_probabilities(
-            states, transit_keys, optim_paras, dense_key_to_dense_covariates
-        )
-        dump_objects(transition_probabilities, "transition", complex_, options)
 
-    return wages, nonpecs
+def _create_reward_coefficients(labels, optim_paras):
+    """Create the coefficients of the reward covariates.
 
+    The matrix has one row per label and two columns per choice. The first half of the
+    columns holds the coefficients of the log wages and the second half the coefficients
+    of the non-pecuniary rewards. Coefficients of missing labels or equations are zero.
+
+    """
+    n_choices = len(optim_paras["choices"])
+    coefficients = np.zeros((len(labels), 2 * n_choices))
 
-def _create_choice_rewards(states, choice_set, optim_paras):
-    """Create wage and non-pecuniary reward for each state and choice."""
-    n_choices = sum(choice_set)
-    choices = select_valid_choices(optim_paras["choices"], choice_set)
+    for i, choice in enumerate(optim_paras["choices"]):
+        for j, reward in enumerate(["wage", "nonpec"]):
+            if f"{reward}_{choice}" in optim_paras:
+                coefficients[:, j * n_choices + i] = (
+                    optim_paras[f"{reward}_{choice}"]
+                    .reindex(labels, fill_value=0)
+                    .to_numpy()
+                )
 
-    n_states = states.shape[0]
+    return coefficients
 
-    wages = np.ones((n_states, n_choices))
-    nonpecs = np.zeros((n_states, n_choices))
 
-    for i, choice in enumerate(choices):
-        if f"wage_{choice}" in optim_paras:
-            log_wage = pandas_dot(states, optim_paras[f"wage_{choice}"])
-            wages[:, i] = np.exp(log_wage)
+def _create_choice_rewards(core_covariates, dense_covariates, coefficients, choice_set):
+    """Create wage and non-pecuniary reward for each state and choice.
 
-        if f"nonpec_{choice}" in optim_paras:
-            nonpecs[:, i] = pandas_dot(states, optim_paras[f"nonpec_{choice}"])
+    The coefficients have a leading axis for parameter vectors. The rewards of all
+    choices and parameter vectors are computed with one matrix product of the reward
+    covariates and the coefficients. Choices without a wage equation have a log wage of
+    zero and, thus, a wage of one.
+
+    Returns
+    -------
+    wages : numpy.ndarray
+        Array with shape (n_params, n_states, n_valid_choices).
+    nonpecs : numpy.ndarray
+        Array with shape (n_params, n_states, n_valid_choices).
+
+    """
+    n_choices = len(choice_set)
+    valid_choices = np.flatnonzero(choice_set)
+    columns = np.concatenate((valid_choices, n_choices + valid_choices))
+
+    n_params = coefficients["core"].shape[0]
+    n_states = core_covariates.shape[0]
+    n_columns = len(columns)
+
+    rewards = core_covariates @ _stack_parameter_axis(coefficients["core"], columns)
+    if dense_covariates is not None:
+        rewards += dense_covariates @ _stack_parameter_axis(
+            coefficients["dense"], columns
+        )
+    rewards = rewards.reshape(n_states, n_params, n_columns).transpose(1, 0, 2)
+
+    n_valid_choices = len(valid_choices)
+    wages = np.ascontiguousarray(np.exp(rewards[:, :, :n_valid_choices]))
+    nonpecs = np.ascontiguousarray(rewards[:, :, n_valid_choices:])
 
     return wages, nonpecs
 
 
+def _stack_parameter_axis(coefficients, columns):
+    """Stack the selected columns of coefficients of all parameter vectors."""
+    n_params, n_labels, _ = coefficients.shape
+    selected = coefficients[:, :, columns]
+
+    return selected.transpose(1, 0, 2).reshape(n_labels, n_params * len(columns))
+
+
 def _solve_with_backward_induction(state_space, optim_paras, options):
     """Calculate utilities with backward induction.
 
@@ -138,6 +596,12 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
     2. If there are more states in the period than interpolation points.
     3. If there are at least two interpolation points per `dense_index`.
 
+    Otherwise, the expected value functions are computed with Monte Carlo integration,
+    with the weighted nodes of a quadrature rule if ``options["solution_integration"]``
+    is ``"gauss_hermite"`` or ``"smolyak"`` or, if it is ``"analytic"``, with the
+    approximation in :func:`~respy.shared.calculate_analytic_expected_value_function`.
+    Interpolated periods never use the analytic approximation.
+
     Parameters
     ----------
     state_space : :class:`~respy.state_space.StateSpace`
@@ -153,35 +617,23 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
 
     """
     n_periods = options["n_periods"]
-
-    # Can we move that up to the other function? Then we have everything at one point
-    # that is params specific?
-    draws_emax_risk = transform_base_draws_with_cholesky_factor(
-        state_space.base_draws_sol,
-        state_space.dense_key_to_choice_set,
-        optim_paras["shocks_cholesky"],
-        optim_paras,
-    )
+    draws_emax_risk = state_space.draws_emax_risk
 
     for period in reversed(range(n_periods)):
         dense_keys_in_period = state_space.get_dense_keys_from_period(period)
 
+        # Read the memory maps of the previous period while this period is solved.
+        if options["solution_out_of_core"]:
+            _prefetch_memory_maps_of_period(state_space, period - 1)
+
         period_draws_emax_risk = {
             dense_index: draws_emax_risk[dense_index]
             for dense_index in dense_keys_in_period
+            if dense_index in draws_emax_risk
         }
 
-        n_states_in_period = sum(
-            len(state_space.dense_key_to_core_indices[dense_index])
-            for dense_index in dense_keys_in_period
-        )
-
         # See docstring for note on interpolation.
-        any_interpolated = options[
-            "interpolation_points"
-        ] < n_states_in_period and options["interpolation_points"] >= 2 * len(
-            dense_keys_in_period
-        )
+        any_interpolated = state_space.is_period_interpolated(period, options)
 
         # Handle myopic individuals. Check interpolation!
         if optim_paras["delta"] == 0:
@@ -197,33 +649,438 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
             wages = state_space.get_attribute_from_period("wages", period)
             nonpecs = state_space.get_attribute_from_period("nonpecs", period)
             continuation_values = state_space.get_continuation_values(period)
-            period_expected_value_functions = _full_solution(
-                wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras
-            )
+
+            if options["solution_integration"] == "analytic":
+                period_expected_value_functions = _analytic_solution(
+                    wages,
+                    nonpecs,
+                    continuation_values,
+                    {
+                        key: state_space.dense_key_to_choice_set[key]
+                        for key in dense_keys_in_period
+                    },
+                    optim_paras,
+                )
+            else:
+                period_expected_value_functions = _full_solution(
+                    wages,
+                    nonpecs,
+                    continuation_values,
+                    period_draws_emax_risk,
+                    optim_paras,
+                    _get_period_weights(state_space, period),
+                    options["solution_out_of_core"],
+                )
 
         state_space.set_attribute_from_keys(
             "expected_value_functions", period_expected_value_functions
         )
 
+        if options["solution_out_of_core"]:
+            _release_memory_maps_of_solved_period(state_space, period)
+
     return state_space
 
 
-@parallelize_across_dense_dimensions
+def _get_period_weights(state_space, period):
+    """Get the weights of the draws of a period or ``None`` for Monte Carlo draws."""
+    if state_space.base_weights_sol is None:
+        period_weights = None
+    else:
+        period_weights = {
+            key: state_space.base_weights_sol[key]
+            for key in state_space.get_dense_keys_from_period(period)
+        }
+
+    return period_weights
+
+
+def _prefetch_memory_maps_of_period(state_space, period):
+    """Prefetch the memory maps which are needed to solve a period.
+
+    These are the rewards, child indices and expected value functions of the period.
+    The expected value functions of the next period are still in memory.
+
+    """
+    attributes = ["wages", "nonpecs", "expected_value_functions"]
+    if state_space.child_indices is not None:
+        attributes.append("child_indices")
+
+    for attribute in attributes:
+        for array in state_space.get_attribute_from_period(attribute, period).values():
+            prefetch_memory_map(array)
+
+
+def _release_memory_maps_of_solved_period(state_space, period):
+    """Release the memory maps which are not needed to solve earlier periods.
+
+    These are the rewards and child indices of the period and the expected value
+    functions of the next period.
+
+    """
+    attributes = [
+        ("wages", period),
+        ("nonpecs", period),
+        ("expected_value_functions", period + 1),
+    ]
+    if state_space.child_indices is not None:
+        attributes.append(("child_indices", period))
+
+    for attribute, period_ in attributes:
+        for array in state_space.get_attribute_from_period(attribute, period_).values():
+            release_memory_map(array)
+
+
 def _full_solution(
-    wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras
+    wages,
+    nonpecs,
+    continuation_values,
+    period_draws_emax_risk,
+    optim_paras,
+    period_weights=None,
+    out_of_core=False,
 ):
     """Calculate the full solution of the model.
 
     In contrast to approximate solution, the Monte Carlo integration is done for each
     state and not only a subset of states.
 
+    See :func:`_full_solution_of_batch` which is called with a single parameter vector.
+
+    """
+    period_expected_value_functions = _full_solution_of_batch(
+        *[
+            {key: value[np.newaxis] for key, value in x.items()}
+            for x in [wages, nonpecs, continuation_values, period_draws_emax_risk]
+        ],
+        np.array([optim_paras["delta"]], dtype=np.float64),
+        period_weights,
+        out_of_core,
+    )
+
+    return {key: value[0] for key, value in period_expected_value_functions.items()}
+
+
+def _full_solution_of_batch(
+    wages,
+    nonpecs,
+    continuation_values,
+    period_draws_emax_risk,
+    delta,
+    period_weights=None,
+    out_of_core=False,
+):
+    """Calculate the full solution of a period for a batch of parameter vectors.
+
+    The inputs of all dense keys in the period are laid out contiguously such that the
+    expected value functions of the whole period and all parameter vectors are computed
+    with a single call to :func:`_calculate_expected_value_functions_of_period` instead
+    of one call per dense key.
+
+    Parameters
+    ----------
+    wages, nonpecs, continuation_values : dict
+        Maps dense keys to arrays with shape (n_params, n_states, n_choices).
+    period_draws_emax_risk : dict
+        Maps dense keys to arrays with shape (n_params, n_draws, n_choices).
+    delta : numpy.ndarray
+        Array with shape (n_params,) containing the discount factors.
+    period_weights : dict or None
+        Maps dense keys to arrays with shape (n_draws,) containing the weights of the
+        nodes of a quadrature rule. ``None`` for Monte Carlo integration.
+    out_of_core : bool
+        Whether the rewards are memory maps. Then, each dense key is solved separately.
+
+    Returns
+    -------
+    period_expected_value_functions : dict
+        Maps dense keys to arrays with shape (n_params, n_states).
+
     """
-    period_expected_value_functions = calculate_expected_value_functions(
-        wages,
-        nonpecs,
-        continuation_values,
-        period_draws_emax_risk,
+    n_params = delta.shape[0]
+
+    # Out-of-core, the inputs of a period are not concatenated in memory. The dense keys
+    # are solved one after another and their memory maps are passed without copies.
+    if out_of_core:
+        chunks = [[key] for key in wages]
+    else:
+        chunks = [list(wages)]
+
+    period_expected_value_functions = {}
+    for dense_keys in chunks:
+        n_states = np.array([wages[key].shape[1] for key in dense_keys], dtype=np.int64)
+        n_choices = np.array(
+            [wages[key].shape[2] for key in dense_keys], dtype=np.int64
+        )
+        n_draws = np.array(
+            [period_draws_emax_risk[key].shape[1] for key in dense_keys],
+            dtype=np.int64,
+        )
+
+        expected_value_functions = _calculate_expected_value_functions_of_period(
+            *[
+                _concatenate_inputs_of_dense_keys(x, dense_keys, n_params)
+                for x in [wages, nonpecs, continuation_values, period_draws_emax_risk]
+            ],
+            n_states,
+            n_choices,
+            n_draws,
+            delta,
+            None
+            if period_weights is None
+            else np.concatenate([period_weights[key] for key in dense_keys]),
+        )
+
+        period_expected_value_functions.update(
+            zip(
+                dense_keys,
+                np.split(expected_value_functions, np.cumsum(n_states)[:-1], axis=1),
+            )
+        )
+
+    return period_expected_value_functions
+
+
+def _concatenate_inputs_of_dense_keys(inputs, dense_keys, n_params):
+    """Concatenate the flattened inputs of dense keys along the second axis.
+
+    The input of a single dense key is only reshaped such that memory maps are not
+    copied.
+
+    """
+    if len(dense_keys) == 1:
+        concatenated = np.asarray(inputs[dense_keys[0]]).reshape(n_params, -1)
+    else:
+        concatenated = np.concatenate(
+            [inputs[key].reshape(n_params, -1) for key in dense_keys], axis=1
+        )
+
+    return np.ascontiguousarray(concatenated, dtype=np.float64)
+
+
+@nb.njit(parallel=True)
+def _calculate_expected_value_functions_of_period(
+    wages,
+    nonpecs,
+    continuation_values,
+    draws,
+    n_states,
+    n_choices,
+    n_draws,
+    delta,
+    weights=None,
+):
+    """Calculate the expected value functions of all states in a period.
+
+    The function computes the same expected value functions as
+    :func:`~respy.shared.calculate_expected_value_functions`, but for the states of all
+    dense keys of a period and for multiple parameter vectors at once and in parallel
+    over states. The offsets of a state are computed once and shared by all parameter
+    vectors.
+
+    The rows of the dense keys are flattened and concatenated along the second axis. The
+    dense key of a state determines the number of admissible choices, the offset of its
+    rewards and continuation values and its draws.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_params, n_values) containing the concatenated and flattened
+        arrays with shape (n_states, n_choices) of each dense key containing wages.
+    nonpecs : numpy.ndarray
+        Concatenated and flattened non-pecuniary rewards.
+    continuation_values : numpy.ndarray
+        Concatenated and flattened continuation values.
+    draws : numpy.ndarray
+        Array with shape (n_params, n_draw_values) containing the concatenated and
+        flattened arrays with shape (n_draws, n_choices) of each dense key containing
+        draws.
+    n_states : numpy.ndarray
+        Array with shape (n_dense_keys,) containing the number of states per dense key.
+    n_choices : numpy.ndarray
+        Array with shape (n_dense_keys,) containing the number of choices per dense key.
+    n_draws : numpy.ndarray
+        Array with shape (n_dense_keys,) containing the number of draws per dense key.
+    delta : numpy.ndarray
+        Array with shape (n_params,) containing the discount factors.
+    weights : numpy.ndarray or None
+        Concatenated arrays with shape (n_draws,) of each dense key containing the
+        weights of the draws. If ``None``, the draws have equal weights.
+
+    Returns
+    -------
+    expected_value_functions : numpy.ndarray
+        Array with shape (n_params, n_states_in_period) containing the expected value
+        functions.
+
+    """
+    n_params = delta.shape[0]
+    (
+        state_offsets,
+        value_offsets,
+        draw_offsets,
+        state_to_dense_key,
+    ) = _create_offsets_of_period(n_states, n_choices, n_draws)
+
+    weight_offsets = np.zeros(n_draws.shape[0] + 1, dtype=np.int64)
+    weight_offsets[1:] = np.cumsum(n_draws)
+
+    expected_value_functions = np.empty((n_params, state_offsets[-1]))
+
+    for state in nb.prange(state_offsets[-1]):
+        k = state_to_dense_key[state]
+        start = value_offsets[k] + (state - state_offsets[k]) * n_choices[k]
+        end = start + n_choices[k]
+
+        for p in range(n_params):
+            period_draws = draws[p, draw_offsets[k] : draw_offsets[k + 1]].reshape(
+                (n_draws[k], n_choices[k])
+            )
+            if weights is None:
+                expected_value_functions[p, state] = calculate_expected_value_function(
+                    wages[p, start:end],
+                    nonpecs[p, start:end],
+                    continuation_values[p, start:end],
+                    period_draws,
+                    delta[p],
+                )
+            else:
+                expected_value_functions[p, state] = calculate_expected_value_function(
+                    wages[p, start:end],
+                    nonpecs[p, start:end],
+                    continuation_values[p, start:end],
+                    period_draws,
+                    delta[p],
+                    weights[weight_offsets[k] : weight_offsets[k + 1]],
+                )
+
+    return expected_value_functions
+
+
+def _analytic_solution(wages, nonpecs, continuation_values, choice_sets, optim_paras):
+    """Calculate the full solution with analytic expected value functions.
+
+    The expected value functions of all states in the period are approximated with
+    :func:`~respy.shared.calculate_analytic_expected_value_function` instead of Monte
+    Carlo integration. As in :func:`_full_solution`, the inputs of all dense keys are
+    laid out contiguously and passed to a single kernel.
+
+    """
+    dense_keys = list(wages)
+    n_wages_raw = len(optim_paras["choices_w_wage"])
+
+    shocks_cov = {}
+    for choice_set in set(choice_sets.values()):
+        shocks_cholesky = subset_cholesky_factor_to_choice_set(
+            optim_paras["shocks_cholesky"], choice_set
+        )
+        shocks_cov[choice_set] = shocks_cholesky.dot(shocks_cholesky.T)
+
+    n_states = np.array([wages[key].shape[0] for key in dense_keys], dtype=np.int64)
+    n_choices = np.array([wages[key].shape[1] for key in dense_keys], dtype=np.int64)
+    n_wages = np.array(
+        [sum(choice_sets[key][:n_wages_raw]) for key in dense_keys], dtype=np.int64
+    )
+
+    expected_value_functions = _calculate_analytic_expected_value_functions_of_period(
+        *[
+            np.concatenate([np.ravel(x[key]) for key in dense_keys]).astype(np.float64)
+            for x in [wages, nonpecs, continuation_values]
+        ],
+        np.concatenate([np.ravel(shocks_cov[choice_sets[key]]) for key in dense_keys]),
+        n_states,
+        n_choices,
+        n_wages,
         optim_paras["delta"],
     )
 
+    period_expected_value_functions = dict(
+        zip(dense_keys, np.split(expected_value_functions, np.cumsum(n_states)[:-1]))
+    )
+
     return period_expected_value_functions
+
+
+@nb.njit(parallel=True)
+def _calculate_analytic_expected_value_functions_of_period(
+    wages, nonpecs, continuation_values, shocks_cov, n_states, n_choices, n_wages, delta
+):
+    """Approximate the expected value functions of all states in a period.
+
+    The layout of the inputs follows
+    :func:`_calculate_expected_value_functions_of_period` with a single parameter
+    vector. Instead of draws, ``shocks_cov`` contains the concatenated and flattened
+    variance-covariance matrices with shape (n_choices, n_choices) of each dense key and
+    ``n_wages`` contains the number of choices with wages per dense key.
+
+    """
+    (
+        state_offsets,
+        value_offsets,
+        cov_offsets,
+        state_to_dense_key,
+    ) = _create_offsets_of_period(n_states, n_choices, n_choices)
+
+    expected_value_functions = np.empty(state_offsets[-1])
+
+    for state in nb.prange(state_offsets[-1]):
+        k = state_to_dense_key[state]
+        start = value_offsets[k] + (state - state_offsets[k]) * n_choices[k]
+        end = start + n_choices[k]
+
+        expected_value_functions[state] = calculate_analytic_expected_value_function(
+            wages[start:end],
+            nonpecs[start:end],
+            continuation_values[start:end],
+            shocks_cov[cov_offsets[k] : cov_offsets[k + 1]].reshape(
+                (n_choices[k], n_choices[k])
+            ),
+            n_wages[k],
+            delta,
+        )
+
+    return expected_value_functions
+
+
+@nb.njit
+def _create_offsets_of_period(n_states, n_choices, n_rows):
+    """Create the offsets of the concatenated inputs of the dense keys in a period.
+
+    Parameters
+    ----------
+    n_states : numpy.ndarray
+        Array with shape (n_dense_keys,) containing the number of states per dense key.
+    n_choices : numpy.ndarray
+        Array with shape (n_dense_keys,) containing the number of choices per dense key.
+    n_rows : numpy.ndarray
+        Array with shape (n_dense_keys,) containing the number of rows of an additional
+        input with shape (n_rows, n_choices) per dense key like draws.
+
+    Returns
+    -------
+    state_offsets : numpy.ndarray
+        Array with shape (n_dense_keys + 1,) containing the first state of each dense
+        key.
+    value_offsets : numpy.ndarray
+        Offsets of the rewards and continuation values of each dense key.
+    row_offsets : numpy.ndarray
+        Offsets of the additional input of each dense key.
+    state_to_dense_key : numpy.ndarray
+        Array with shape (n_states_in_period,) mapping states to dense keys.
+
+    """
+    n_dense_keys = n_states.shape[0]
+
+    state_offsets = np.zeros(n_dense_keys + 1, dtype=np.int64)
+    value_offsets = np.zeros(n_dense_keys + 1, dtype=np.int64)
+    row_offsets = np.zeros(n_dense_keys + 1, dtype=np.int64)
+    for k in range(n_dense_keys):
+        state_offsets[k + 1] = state_offsets[k] + n_states[k]
+        value_offsets[k + 1] = value_offsets[k] + n_states[k] * n_choices[k]
+        row_offsets[k + 1] = row_offsets[k] + n_rows[k] * n_choices[k]
+
+    state_to_dense_key = np.empty(state_offsets[-1], dtype=np.int64)
+    for k in range(n_dense_keys):
+        state_to_dense_key[state_offsets[k] : state_offsets[k + 1]] = k
+
+    return state_offsets, value_offsets, row_offsets, state_to_dense_key
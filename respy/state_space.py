@@ -1,5 +1,8 @@
 """Everything related to the state space of a structural model."""
+import collections
 import itertools
+import pickle
+import shutil
 
 import numba as nb
 import numpy as np
@@ -7,58 +10,194 @@ import pandas as pd
 from numba.typed import Dict
 
 from respy._numba import sum_over_numba_boolean_unituple
+from respy.config import INDEXER_DTYPE
+from respy.config import INDEXER_INVALID_INDEX
+from respy.config import INDEXER_MAX_SPARSITY
 from respy.exogenous_processes import create_transit_choice_set
 from respy.exogenous_processes import create_transition_objects
 from respy.exogenous_processes import weight_continuation_values
 from respy.parallelization import parallelize_across_dense_dimensions
-from respy.shared import apply_law_of_motion_for_core
+from respy.pre_processing.process_covariates import identify_necessary_covariates
 from respy.shared import compute_covariates
 from respy.shared import convert_dictionary_keys_to_dense_indices
 from respy.shared import create_base_draws
+from respy.shared import create_base_nodes_and_weights
 from respy.shared import create_core_state_space_columns
+from respy.shared import create_core_state_space_shape
 from respy.shared import create_dense_state_space_columns
+from respy.shared import create_memory_map
 from respy.shared import downcast_to_smallest_dtype
 from respy.shared import dump_objects
+from respy.shared import get_cache_directory
+from respy.shared import get_smallest_integer_dtype
+from respy.shared import load_memory_map
 from respy.shared import load_objects
-from respy.shared import map_states_to_core_key_and_core_index
+from respy.shared import load_states
+from respy.shared import map_codes_to_core_key_and_core_index
 from respy.shared import prepare_cache_directory
 from respy.shared import return_core_dense_key
 
 
+_STATE_SPACE_FILE_NAME = "state_space.pickle"
+"""str : Name of the file which contains the structural objects of the state space."""
+
+_NOT_CACHED_ATTRIBUTES = [
+    "optim_paras",
+    "options",
+    "base_draws_sol",
+    "base_weights_sol",
+    "draws_emax_risk",
+    "expected_value_functions",
+    "stage_keys",
+    "solution_cache",
+    "reward_covariates",
+    "core_key_to_reward_covariates",
+    "dense_key_to_reward_covariates",
+]
+
+
 def create_state_space_class(optim_paras, options):
-    """Create the state space of the model."""
-    prepare_cache_directory(options)
-    core = _create_core_state_space(optim_paras, options)
-    dense_grid = _create_dense_state_space_grid(optim_paras)
+    """Create the state space of the model.
 
-    # Downcast after calculations or be aware of silent integer overflows.
-    core = compute_covariates(core, options["covariates_core"])
-    core = core.apply(downcast_to_smallest_dtype)
-    dense = _create_dense_state_space_covariates(dense_grid, optim_paras, options)
+    The state space only depends on the structure of the model and not on parameter
+    values. Thus, it is cached in :func:`~respy.shared.get_cache_directory` and, if the
+    cache exists, loaded instead of being created again.
 
-    core_period_choice = _create_core_period_choice(core, optim_paras, options)
+    Otherwise, the state space is built in the directory of the run and published to
+    the cache afterwards such that processes with the same model can share it.
 
-    core_key_to_complex = dict(enumerate(core_period_choice))
-    core_key_to_core_indices = {
-        i: core_period_choice[complex_] for i, complex_ in core_key_to_complex.items()
-    }
+    """
+    state_space = _load_state_space(optim_paras, options)
+
+    if state_space is None:
+        build_options = prepare_cache_directory(options)
+        core = _create_core_state_space(optim_paras, build_options)
+        dense_grid = _create_dense_state_space_grid(optim_paras)
+
+        # Downcast after calculations or be aware of silent integer overflows.
+        core = compute_covariates(core, build_options["covariates_core"])
+        core = core.apply(downcast_to_smallest_dtype)
+        indices_dtype = get_smallest_integer_dtype(core.shape[0])
+        dense = _create_dense_state_space_covariates(
+            dense_grid, optim_paras, build_options
+        )
 
-    indexer = _create_indexer(core, core_key_to_core_indices, optim_paras)
+        core_period_choice, dense_period_choice = _create_period_choice_cores(
+            core, dense, optim_paras, build_options
+        )
 
-    dense_period_choice = _create_dense_period_choice(
-        core, dense, core_key_to_core_indices, core_key_to_complex, optim_paras, options
-    )
+        core_key_to_complex = dict(enumerate(core_period_choice))
+        core_key_to_core_indices = {
+            i: core_period_choice[complex_].to_numpy(dtype=indices_dtype)
+            for i, complex_ in core_key_to_complex.items()
+        }
 
-    state_space = StateSpace(
-        core,
-        indexer,
-        dense,
-        dense_period_choice,
-        core_key_to_complex,
-        core_key_to_core_indices,
-        optim_paras,
-        options,
+        indexer = _create_indexer(core, core_key_to_core_indices, optim_paras)
+
+        state_space = StateSpace(
+            indexer,
+            dense,
+            dense_period_choice,
+            core_key_to_complex,
+            core_key_to_core_indices,
+            optim_paras,
+            build_options,
+        )
+
+        _dump_state_space(state_space, build_options)
+        _publish_state_space(build_options, options)
+        state_space.options = options
+
+    return state_space
+
+
+def _dump_state_space(state_space, options):
+    """Dump the structural objects of the state space to the cache.
+
+    Objects which depend on parameters or options which do not affect the structure
+    like draws and expected value functions are not stored.
+
+    """
+    # Child indices stored out-of-core are loaded from their own files.
+    not_cached = _NOT_CACHED_ATTRIBUTES + (
+        ["child_indices"] if options["solution_out_of_core"] else []
     )
+    attributes = {
+        name: value
+        for name, value in vars(state_space).items()
+        if name not in not_cached
+    }
+
+    path = get_cache_directory(options) / _STATE_SPACE_FILE_NAME
+    with open(path, "wb") as file:
+        pickle.dump(attributes, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _publish_state_space(build_options, options):
+    """Publish the state space built in the directory of the run to the cache.
+
+    The directory is renamed which is atomic. If another process has published the
+    same state space in the meantime, the own copy is discarded. Incomplete caches, for
+    example, from interrupted runs of older versions, are replaced.
+
+    """
+    build_directory = get_cache_directory(build_options)
+    directory = get_cache_directory(options)
+
+    for _ in range(2):
+        try:
+            build_directory.rename(directory)
+        except OSError:
+            if (directory / _STATE_SPACE_FILE_NAME).exists():
+                shutil.rmtree(build_directory)
+                break
+            else:
+                trash = build_directory.with_name(f"{directory.name}_incomplete")
+                try:
+                    directory.rename(trash)
+                except OSError:
+                    pass
+                else:
+                    shutil.rmtree(trash)
+        else:
+            break
+
+
+def _load_state_space(optim_paras, options):
+    """Load the state space from the cache.
+
+    Returns
+    -------
+    state_space : StateSpace or None
+        The state space or :obj:`None` if the state space is not cached.
+
+    """
+    path = get_cache_directory(options) / _STATE_SPACE_FILE_NAME
+
+    try:
+        with open(path, "rb") as file:
+            attributes = pickle.load(file)
+    except FileNotFoundError:
+        state_space = None
+    else:
+        state_space = StateSpace.__new__(StateSpace)
+        vars(state_space).update(attributes)
+        state_space.optim_paras = optim_paras
+        state_space.options = options
+        (
+            state_space.base_draws_sol,
+            state_space.base_weights_sol,
+        ) = state_space.create_draws(options)
+        state_space.create_arrays_for_expected_value_functions()
+        state_space.stage_keys = {}
+        state_space.solution_cache = collections.OrderedDict()
+
+        if options["solution_out_of_core"]:
+            state_space.child_indices = {
+                key: load_memory_map("child_indices", complex_, options)
+                for key, complex_ in state_space.dense_key_to_complex.items()
+                if complex_[0] < options["n_periods"] - 1
+            } or None
 
     return state_space
 
@@ -68,19 +207,25 @@ class StateSpace:
 
     Attributes
     ----------
-    core : dict of pandas.DataFrame
+    core : pandas.DataFrame
         The core state space is a :class:`pandas.DataFrame` that contains all states of
         core dimensions. A core dimension is a dimension whose value is uniquely
         determined by past choices and time. Core dimensions include choices,
-        experiences, lagged choices and periods.
+        experiences, lagged choices and periods. The core is not kept in memory, but
+        decoded from the indexer on access. See :attr:`StateSpace.core`.
     dense_key_to_core_indices : Dict[int, Array[int]]
         A mapping from dense keys to ``.loc`` locations in the ``core``.
+    stage_keys : dict
+        The keys of the stages of the last solution. See
+        :func:`respy.solve.solve`.
+    solution_cache : collections.OrderedDict
+        The most recently used solutions if ``options["solution_cache_size"]`` is
+        positive.
 
     """
 
     def __init__(
         self,
-        core,
         indexer,
         dense,
         dense_period_cores,
@@ -96,11 +241,9 @@ class StateSpace:
 
         Parameters
         ----------
-        core : pandas.DataFrame
-            DataFrame containing one core state per row.
-        indexer : numba.typed.Dict
-            Maps states (rows of core) into tuples containing core key and
-            core index. i : state -> (core_key, core_index)
+        indexer : dict
+            Maps states (rows of core) into core key and core index with a
+            mixed-radix encoding. i : state -> (core_key, core_index)
         dense : dict
             Maps dense states into dense covariates.
         dense_period_cores : dict
@@ -112,7 +255,6 @@ class StateSpace:
             Maps core_keys into core_indices.
 
         """
-        self.core = core
         self.indexer = indexer
         self.dense_period_cores = dense_period_cores
         self.dense = dense
@@ -122,13 +264,43 @@ class StateSpace:
         self.options = options
         self.n_periods = options["n_periods"]
         self._create_conversion_dictionaries()
-        self.base_draws_sol = self.create_draws(options)
+        self.base_draws_sol, self.base_weights_sol = self.create_draws(options)
         self.create_arrays_for_expected_value_functions()
+        self.stage_keys = {}
+        self.solution_cache = collections.OrderedDict()
 
         if len(self.optim_paras["exogenous_processes"]) > 0:
             self.create_objects_for_exogenous_processes()
         self.child_indices = self.collect_child_indices()
 
+    @property
+    def core(self):
+        """pandas.DataFrame: The core state space.
+
+        Each core state is packed into a single integer, its code in the indexer, and
+        the core is decoded from the codes on access. Thus, the state space does not
+        hold a DataFrame with one column for every core dimension and covariate.
+
+        """
+        core_columns = ["period"] + create_core_state_space_columns(self.optim_paras)
+
+        indices = list(self.core_key_to_core_indices.values())
+        offsets = np.cumsum([0] + [len(i) for i in indices[:-1]], dtype=np.int64)
+        positions = offsets[self.indexer["core_key"]] + self.indexer["core_index"]
+        labels = np.concatenate(indices)[positions]
+
+        states = np.empty((labels.shape[0], len(core_columns)), dtype=np.int64)
+        states[labels] = np.column_stack(
+            np.unravel_index(self.indexer["codes"], self.indexer["shape"])
+        )
+
+        core = pd.DataFrame(states, columns=core_columns)
+        core = core.apply(downcast_to_smallest_dtype)
+        core = compute_covariates(core, self.options["covariates_core"])
+        core = core.apply(downcast_to_smallest_dtype)
+
+        return core
+
     def _create_conversion_dictionaries(self):
         """Create mappings between state space location indices and properties.
 
@@ -144,19 +316,32 @@ class StateSpace:
             for i in self.dense_key_to_complex
         }
 
+        # Dense keys are not sorted by period. Thus, store the keys of every period.
+        self.period_to_dense_keys = {period: [] for period in range(self.n_periods)}
+        for i, complex_ in self.dense_key_to_complex.items():
+            self.period_to_dense_keys[complex_[0]].append(i)
+
         self.dense_key_to_choice_set = {
             i: self.dense_key_to_complex[i][1] for i in self.dense_key_to_complex
         }
 
+        self.dense_key_to_core_complex = {
+            i: self.core_key_to_complex[self.dense_key_to_core_key[i]]
+            for i in self.dense_key_to_complex
+        }
+
+        # Dense keys with the same core key share the array of core indices.
         self.dense_key_to_core_indices = {
-            i: np.array(self.core_key_to_core_indices[self.dense_key_to_core_key[i]])
+            i: self.core_key_to_core_indices[self.dense_key_to_core_key[i]]
             for i in self.dense_key_to_complex
         }
 
-        self.core_key_and_dense_index_to_dense_key = Dict.empty(
-            key_type=nb.types.UniTuple(nb.types.int64, 2), value_type=nb.types.int64,
+        n_dense_indices = len(self.dense) if self.dense else 1
+        self.core_key_and_dense_index_to_dense_key = np.full(
+            (len(self.core_key_to_complex), n_dense_indices),
+            INDEXER_INVALID_INDEX,
+            dtype=INDEXER_DTYPE,
         )
-
         for i in self.dense_key_to_complex:
             self.core_key_and_dense_index_to_dense_key[
                 return_core_dense_key(
@@ -165,32 +350,91 @@ class StateSpace:
             ] = i
 
         if self.dense is False:
-            self.dense_covariates_to_dense_index = {}
+            self.dense_covariates_to_dense_index = None
             self.dense_key_to_dense_covariates = {
                 i: {} for i in self.dense_key_to_complex
             }
+            self.dense_key_to_dense_variables = {
+                i: {} for i in self.dense_key_to_complex
+            }
 
         else:
-            n_dense = len(create_dense_state_space_columns(self.optim_paras))
-            self.dense_covariates_to_dense_index = Dict.empty(
-                key_type=nb.types.UniTuple(nb.types.int64, n_dense),
-                value_type=nb.types.int64,
+            dense_grid = np.array(list(self.dense), dtype=np.int64)
+            self.dense_covariates_to_dense_index = np.full(
+                dense_grid.max(axis=0) + 1, INDEXER_INVALID_INDEX, dtype=INDEXER_DTYPE
+            )
+            self.dense_covariates_to_dense_index[tuple(dense_grid.T)] = np.arange(
+                dense_grid.shape[0]
             )
-            for i, k in enumerate(self.dense):
-                self.dense_covariates_to_dense_index[k] = i
 
+            dense_index_to_dense_covariates = list(self.dense)
             self.dense_key_to_dense_covariates = {
-                i: list(self.dense.keys())[self.dense_key_to_complex[i][2]]
+                i: dense_index_to_dense_covariates[self.dense_key_to_complex[i][2]]
+                for i in self.dense_key_to_complex
+            }
+            self.dense_key_to_dense_variables = {
+                i: self.dense[self.dense_key_to_dense_covariates[i]]
                 for i in self.dense_key_to_complex
             }
 
+    def create_reward_covariates(self, optim_paras):
+        """Create the covariates of wages and non-pecuniary rewards.
+
+        The covariates do not depend on parameter values. Thus, they are stored as
+        contiguous float matrices and the rewards for new parameters are matrix products
+        without loading states or computing covariates.
+
+        Covariates which only depend on core information are stored once per core key
+        and shared by all dense keys with the same core key. The remaining covariates
+        are stored per dense key.
+
+        Parameters
+        ----------
+        optim_paras : dict
+            The labels of the covariates are the index of the wage and non-pecuniary
+            parameters.
+
+        """
+        labels = create_reward_covariate_labels(optim_paras)
+        core_columns = (
+            ["period"]
+            + create_core_state_space_columns(optim_paras)
+            + list(self.options["covariates_core"])
+        )
+        self.reward_covariates = {
+            "core": [label for label in labels if label in core_columns],
+            "dense": [label for label in labels if label not in core_columns],
+        }
+
+        self.core_key_to_reward_covariates = _create_core_reward_covariates(
+            self.core_key_to_complex, self.reward_covariates["core"], self.options
+        )
+        self.dense_key_to_reward_covariates = _create_dense_reward_covariates(
+            self.dense_key_to_complex,
+            self.dense_key_to_core_complex,
+            self.dense_key_to_dense_variables,
+            self.reward_covariates["dense"],
+            self.options,
+        )
+
     def create_arrays_for_expected_value_functions(self):
         """Create a container for expected value functions."""
-        self.expected_value_functions = Dict.empty(
-            key_type=nb.types.int64, value_type=nb.types.float64[:]
-        )
-        for index, indices in self.dense_key_to_core_indices.items():
-            self.expected_value_functions[index] = np.zeros(len(indices))
+        if self.options["solution_out_of_core"]:
+            self.expected_value_functions = {
+                index: create_memory_map(
+                    np.zeros(len(indices)),
+                    "expected_value_functions",
+                    self.dense_key_to_complex[index],
+                    self.options,
+                )
+                for index, indices in self.dense_key_to_core_indices.items()
+            }
+        else:
+            self.expected_value_functions = Dict.empty(
+                key_type=nb.types.int64, value_type=nb.types.float64[:]
+            )
+            for index, indices in self.dense_key_to_core_indices.items():
+                self.expected_value_functions[index] = np.zeros(len(indices))
 
     def create_objects_for_exogenous_processes(self):
         """Create mappings for the implementation of the exogenous processes."""
@@ -217,7 +461,7 @@ class StateSpace:
             self.dense_key_to_transit_keys, self.dense_key_to_choice_set
         )
 
-    def get_continuation_values(self, period):
+    def get_continuation_values(self, period, expected_value_functions=None):
         """Get continuation values.
 
         The function takes the expected value functions from the previous periods and
@@ -226,13 +470,20 @@ class StateSpace:
         returns arrays of zeros since we are in terminal states. Otherwise we retrieve
         expected value functions for next period and call
         :func:`_get_continuation_values` to assign continuation values to all choices
-        within a period. (The object `subset_expected_value_functions` is required
-        because we need a Numba typed dict but the function
-        :meth:`StateSpace.get_attribute_from_period` just returns a normal dict)
+        within a period.
+
+        Parameters
+        ----------
+        period : int
+            The period of the continuation values.
+        expected_value_functions : dict, optional
+            The expected value functions of the next period which can have a leading
+            axis for parameter vectors. By default, the expected value functions of the
+            state space are used.
 
         Returns
         -------
-        continuation_values : numba.typed.Dict
+        continuation_values : dict
             The continuation values for each dense key in a :class:`numpy.ndarray`.
 
         See also
@@ -243,23 +494,18 @@ class StateSpace:
 
         """
         if period == self.n_periods - 1:
-            shapes = self.get_attribute_from_period("base_draws_sol", period)
+            complexes = self.get_attribute_from_period("dense_key_to_complex", period)
             states = self.get_attribute_from_period("dense_key_to_core_indices", period)
             continuation_values = {
-                key: np.zeros((states[key].shape[0], shapes[key].shape[1]))
-                for key in shapes
+                key: np.zeros((states[key].shape[0], sum(complexes[key][1])))
+                for key in complexes
             }
         else:
             child_indices = self.get_attribute_from_period("child_indices", period)
-            expected_value_functions = self.get_attribute_from_period(
-                "expected_value_functions", period + 1
-            )
-            subset_expected_value_functions = Dict.empty(
-                key_type=nb.types.int64, value_type=nb.types.float64[:]
-            )
-            for key, value in expected_value_functions.items():
-                subset_expected_value_functions[key] = value
-
+            if expected_value_functions is None:
+                expected_value_functions = self.get_attribute_from_period(
+                    "expected_value_functions", period + 1
+                )
             transit_choice_sets = (
                 "transit_key_to_choice_set"
                 if hasattr(self, "transit_key_to_choice_set")
@@ -272,7 +518,7 @@ class StateSpace:
                 self.get_attribute_from_period("dense_key_to_core_indices", period),
                 child_indices,
                 self.core_key_and_dense_index_to_dense_key,
-                bypass={"expected_value_functions": subset_expected_value_functions},
+                bypass={"expected_value_functions": expected_value_functions},
             )
 
             if len(self.optim_paras["exogenous_processes"]) > 0:
@@ -324,44 +570,106 @@ class StateSpace:
                 for k in dense_key_to_complex_except_last_period
             }
 
+            dense_key_to_core_complex_except_last_period = {
+                k: self.dense_key_to_core_complex[k]
+                for k in dense_key_to_complex_except_last_period
+            }
+
             child_indices = _collect_child_indices(
                 dense_key_to_complex_except_last_period,
+                dense_key_to_core_complex_except_last_period,
                 dense_key_to_choice_set_except_last_period,
                 self.indexer,
                 self.optim_paras,
                 self.options,
+                n_jobs=self.options["state_space_n_workers"],
             )
 
         return child_indices
 
     def create_draws(self, options):
-        """Get draws."""
-        n_choices_in_sets = list(set(map(sum, self.dense_key_to_choice_set.values())))
+        """Get draws.
+
+        If ``options["solution_integration"]`` is a quadrature rule, the draws are the
+        nodes of the rule which are the same in every period and the weights of the
+        nodes are returned as well. Otherwise, the weights are ``None``.
+
+        If ``options["solution_integration"]`` is ``"analytic"``, draws are only
+        returned for periods whose expected value functions are interpolated. If no
+        period is interpolated, no draws are created.
+
+        """
+        if options["solution_integration"] == "analytic":
+            periods = [
+                period
+                for period in range(options["n_periods"])
+                if self.is_period_interpolated(period, options)
+            ]
+        else:
+            periods = range(options["n_periods"])
+        dense_keys = {
+            key for period in periods for key in self.get_dense_keys_from_period(period)
+        }
+
+        if dense_keys:
+            n_choices_in_sets = list(
+                set(map(sum, self.dense_key_to_choice_set.values()))
+            )
+        else:
+            n_choices_in_sets = []
+        is_quadrature = options["solution_integration"] in ["gauss_hermite", "smolyak"]
         shocks_sets = []
+        weights_sets = []
 
         for n_choices in n_choices_in_sets:
-            draws = create_base_draws(
-                (options["n_periods"], options["solution_draws"], n_choices),
-                next(options["solution_seed_startup"]),
-                options["monte_carlo_sequence"],
-            )
+            if is_quadrature:
+                nodes, weights = create_base_nodes_and_weights(
+                    n_choices,
+                    options["solution_integration"],
+                    options["solution_quadrature_order"],
+                )
+                draws = np.broadcast_to(nodes, (options["n_periods"],) + nodes.shape)
+                weights_sets.append(weights)
+            else:
+                draws = create_base_draws(
+                    (options["n_periods"], options["solution_draws"], n_choices),
+                    next(options["solution_seed_startup"]),
+                    options["monte_carlo_sequence"],
+                )
             shocks_sets.append(draws)
         draws = {}
+        weights = {} if is_quadrature else None
         for dense_idx, complex_ix in self.dense_key_to_complex.items():
+            if dense_idx not in dense_keys:
+                continue
             period = complex_ix[0]
             n_choices = sum(complex_ix[1])
             idx = n_choices_in_sets.index(n_choices)
             draws[dense_idx] = shocks_sets[idx][period]
+            if is_quadrature:
+                weights[dense_idx] = weights_sets[idx]
+
+        return draws, weights
+
+    def is_period_interpolated(self, period, options):
+        """Indicate whether the expected value functions of a period are interpolated.
+
+        See :func:`~respy.solve._solve_with_backward_induction` for the conditions.
 
-        return draws
+        """
+        dense_keys_in_period = self.get_dense_keys_from_period(period)
+        n_states_in_period = sum(
+            len(self.dense_key_to_core_indices[dense_index])
+            for dense_index in dense_keys_in_period
+        )
+
+        return options["interpolation_points"] < n_states_in_period and options[
+            "interpolation_points"
+        ] >= 2 * len(dense_keys_in_period)
 
     def get_dense_keys_from_period(self, period):
         """Get dense indices from one period."""
-        return [
-            dense_index
-            for dense_index, complex_ in self.dense_key_to_complex.items()
-            if complex_[0] == period
-        ]
+        return self.period_to_dense_keys.get(period, [])
 
     def get_attribute_from_period(self, attribute, period):
         """Get an attribute of the state space sliced to a given period.
@@ -374,11 +682,11 @@ class StateSpace:
             Attribute is retrieved from this period.
 
         """
-        dense_indices_in_period = self.get_dense_keys_from_period(period)
+        attr = getattr(self, attribute)
         return {
-            dense_index: attr
-            for dense_index, attr in getattr(self, attribute).items()
-            if dense_index in dense_indices_in_period
+            dense_index: attr[dense_index]
+            for dense_index in self.get_dense_keys_from_period(period)
+            if dense_index in attr
         }
 
     def set_attribute_from_keys(self, attribute, value):
@@ -403,6 +711,121 @@ class StateSpace:
             getattr(self, attribute)[key][:] = value[key]
 
 
+def create_state_space_size(optim_paras, options):
+    """Count the states of the model and project the memory of the solution.
+
+    Only the core state space is created. Choice restrictions are evaluated for one
+    state per combination of core key and dense index because choice restrictions
+    cannot interact between core and dense information. Nothing is written to the cache.
+
+    Returns
+    -------
+    size : pandas.DataFrame
+        DataFrame indexed by period with the number of states and dense keys and the
+        projected number of bytes of the child indices, wages, non-pecuniary rewards,
+        reward covariates, draws and expected value functions. The draws are the nodes
+        of quadrature rules and are only counted in interpolated periods for analytic
+        solutions.
+
+    """
+    # Only covariates used by the choice restrictions are computed.
+    variables = _collect_variables_of_choice_restrictions(options)
+
+    core = _create_core_state_space(optim_paras, options)
+    core = core.apply(downcast_to_smallest_dtype)
+    core = compute_covariates(
+        core, identify_necessary_covariates(variables, options["covariates_core"])
+    )
+
+    dense_grid = _create_dense_state_space_grid(optim_paras)
+    dense = _create_dense_state_space_covariates(dense_grid, optim_paras, options)
+
+    core_period_choice = _create_core_period_choice(core, optim_paras, options)
+    n_core_states = [len(indices) for indices in core_period_choice.values()]
+    indices_size = get_smallest_integer_dtype(
+        max(len(core_period_choice), max(n_core_states))
+    ).itemsize
+
+    if dense:
+        choices = [f"_{choice}" for choice in optim_paras["choices"]]
+        first_indices = [indices[0] for indices in core_period_choice.values()]
+
+        states = core.loc[np.tile(first_indices, len(dense))].copy()
+        for column, values in pd.DataFrame(list(dense.values())).items():
+            states[column] = np.repeat(values.to_numpy(), len(first_indices))
+
+        states = compute_covariates(
+            states, identify_necessary_covariates(variables, options["covariates_all"])
+        )
+        states = create_is_inadmissible(states, optim_paras, options)
+
+        periods = states["period"].to_numpy()
+        n_choices = (~states[choices]).sum(axis=1).to_numpy()
+        n_states = np.tile(n_core_states, len(dense))
+        # Core reward covariates are shared by all dense indices of a core key.
+        is_first_dense_index = np.arange(len(periods)) < len(first_indices)
+    else:
+        periods = np.array([complex_[0] for complex_ in core_period_choice])
+        n_choices = np.array([sum(complex_[1]) for complex_ in core_period_choice])
+        n_states = np.array(n_core_states)
+        is_first_dense_index = True
+
+    labels = create_reward_covariate_labels(optim_paras)
+    core_columns = (
+        ["period"]
+        + create_core_state_space_columns(optim_paras)
+        + list(options["covariates_core"])
+    )
+    n_core_labels = sum(label in core_columns for label in labels)
+    n_dense_labels = len(labels) - n_core_labels
+
+    if options["solution_integration"] in ["gauss_hermite", "smolyak"]:
+        n_nodes = {
+            n: len(
+                create_base_nodes_and_weights(
+                    n,
+                    options["solution_integration"],
+                    options["solution_quadrature_order"],
+                )[1]
+            )
+            for n in np.unique(n_choices)
+        }
+        n_draws = np.array([n_nodes[n] for n in n_choices])
+    else:
+        n_draws = options["solution_draws"]
+
+    float_size = np.dtype(np.float64).itemsize
+    is_not_last_period = periods < options["n_periods"] - 1
+    df = pd.DataFrame(
+        {
+            "period": periods,
+            "n_states": n_states,
+            "n_dense_keys": 1,
+            "child_indices": (
+                n_states * n_choices * 2 * indices_size * is_not_last_period
+            ),
+            "wages": n_states * n_choices * float_size,
+            "nonpecs": n_states * n_choices * float_size,
+            "reward_covariates": (
+                n_states * n_core_labels * float_size * is_first_dense_index
+                + n_states * n_dense_labels * float_size
+            ),
+            "draws": n_draws * n_choices * float_size,
+            "expected_value_functions": n_states * float_size,
+        }
+    )
+    size = df.groupby("period").sum().reindex(range(options["n_periods"]), fill_value=0)
+
+    # Analytic solutions need draws only in interpolated periods.
+    if options["solution_integration"] == "analytic":
+        is_interpolated = (options["interpolation_points"] < size["n_states"]) & (
+            options["interpolation_points"] >= 2 * size["n_dense_keys"]
+        )
+        size["draws"] = size["draws"].where(is_interpolated, 0)
+
+    return size
+
+
 def _create_core_state_space(optim_paras, options):
     """Create the core state space.
 
@@ -413,8 +836,9 @@ def _create_core_state_space(optim_paras, options):
     which abstracts from levels of initial experiences and instead uses the minimum
     initial experience per choice.
 
-    Secondly, the state space is adjusted by all combinations of initial experiences and
-    also filtered, excluding invalid states.
+    Secondly, the state space is adjusted by all combinations of lagged choices and
+    initial experiences. Invalid states are excluded while the combinations are created
+    such that they never enter the state space.
 
     Notes
     -----
@@ -450,9 +874,9 @@ def _create_core_state_space(optim_paras, options):
       choices and a loop for every choice with experience accumulation. Thus, this
       function is useless if the model requires additional or less choices. For each
       number of choices with and without experience, a new function had to be
-      programmed. The following approach uses the same loops over choices with
-      experiences, but they are dynamically created by the recursive function
-      :func:`_create_core_state_space_per_period`.
+      programmed. The following approach enumerates the same experience vectors for
+      an arbitrary number of choices with :func:`_enumerate_experiences`, a compiled
+      function which writes the states into a preallocated array.
 
     - There are characteristics of the state space which are independent from all other
       state space attributes like types (and almost lagged choices). These attributes
@@ -462,7 +886,7 @@ def _create_core_state_space(optim_paras, options):
     See also
     --------
     _create_core_from_choice_experiences
-    _create_core_state_space_per_period
+    _enumerate_experiences
     _filter_core_state_space
     _add_initial_experiences_to_core_state_space
     _create_indexer
@@ -470,9 +894,7 @@ def _create_core_state_space(optim_paras, options):
     """
     core = _create_core_from_choice_experiences(optim_paras)
 
-    core = _add_lagged_choice_to_core_state_space(core, optim_paras)
-
-    core = _filter_core_state_space(core, options)
+    core = _add_lagged_choice_to_core_state_space(core, optim_paras, options)
 
     core = _add_initial_experiences_to_core_state_space(core, optim_paras)
 
@@ -489,9 +911,16 @@ def _create_core_from_choice_experiences(optim_paras):
     combinations of initial experiences are applied later in
     :func:`_add_initial_experiences_to_core_state_space`.
 
+    All experience vectors which are admissible in the last period are enumerated once
+    in lexicographic order by :func:`_enumerate_experiences`. Since every experience
+    vector admissible in an earlier period is admissible in later periods, the states
+    of each period are a subset of this array which is selected with the sum of
+    experiences.
+
     See also
     --------
-    _create_core_state_space_per_period
+    _count_experiences_per_period
+    _enumerate_experiences
 
     """
     choices_w_exp = list(optim_paras["choices_w_exp"])
@@ -505,83 +934,130 @@ def _create_core_from_choice_experiences(optim_paras):
     )
 
     additional_exp = maximum_exp - minimal_initial_experience
+    n_periods = optim_paras["n_periods"]
 
     exp_cols = [f"exp_{choice}" for choice in choices_w_exp]
 
-    container = []
-    for period in np.arange(optim_paras["n_periods"], dtype=np.uint8):
-        data = _create_core_state_space_per_period(
-            period,
-            additional_exp,
-            optim_paras,
-            np.zeros(len(choices_w_exp), dtype=np.uint8),
-        )
-        df_ = pd.DataFrame.from_records(data, columns=exp_cols)
-        df_.insert(0, "period", period)
-        container.append(df_)
+    n_states_per_period = _count_experiences_per_period(additional_exp, n_periods)
+    experiences = _enumerate_experiences(
+        additional_exp, n_periods - 1, n_states_per_period[-1]
+    )
+    total_experience = experiences.sum(axis=1, dtype=np.int64)
 
-    df = pd.concat(container, axis="rows", sort=False)
+    periods = np.arange(n_periods, dtype=np.uint8)
+    data = np.empty((n_states_per_period.sum(), len(exp_cols) + 1), dtype=np.uint8)
+    data[:, 0] = np.repeat(periods, n_states_per_period)
+
+    start = 0
+    for period, n_states in zip(periods, n_states_per_period):
+        end = start + n_states
+        data[start:end, 1:] = experiences[total_experience <= period]
+        start = end
+
+    df = pd.DataFrame(data=data, columns=["period"] + exp_cols)
 
     return df
 
 
-def _create_core_state_space_per_period(
-    period, additional_exp, optim_paras, experiences, pos=0
-):
-    """Create core state space per period.
+def _count_experiences_per_period(additional_exp, n_periods):
+    r"""Count the number of admissible experience vectors per period.
+
+    In period :math:`t`, an experience vector is admissible if the total experience does
+    not exceed :math:`t` and the experience of each choice does not exceed its
+    additional experience. The number of vectors with a given total experience is the
+    coefficient of a polynomial which is the product of :math:`1 + x + \dots +
+    x^{a_i}` over all choices. The cumulative sum of the coefficients yields the number
+    of vectors per period.
+
+    Examples
+    --------
+    >>> _count_experiences_per_period(np.array([1, 2]), 4)
+    array([1, 3, 5, 6])
+    >>> _count_experiences_per_period(np.array([], dtype=np.uint8), 2)
+    array([1, 1])
+
+    """
+    coefficients = np.ones(1, dtype=np.int64)
+    for max_exp in additional_exp:
+        coefficients = np.convolve(
+            coefficients, np.ones(int(max_exp) + 1, dtype=np.int64)
+        )[:n_periods]
+
+    coefficients = np.pad(coefficients, (0, n_periods - coefficients.shape[0]))
+
+    return coefficients.cumsum()
 
-    First, this function returns a state combined with all possible lagged choices and
-    types.
 
-    Secondly, if there exists a choice with experience in ``additional_exp[pos]``, loop
-    over all admissible experiences, update the state and pass it to the same function,
-    but moving to the next choice which accumulates experience.
+@nb.njit
+def _enumerate_experiences(additional_exp, max_total_exp, n_states):
+    """Enumerate all experience vectors in lexicographic order.
+
+    The function writes all vectors where the experience of each choice does not exceed
+    ``additional_exp`` and the total experience does not exceed ``max_total_exp`` into
+    a preallocated array. The next vector is created like an odometer by incrementing
+    the last position which can be incremented and resetting all following positions
+    to zero.
 
     Parameters
     ----------
-    period : int
-        Number of period.
     additional_exp : numpy.ndarray
-        Array with shape (n_choices_w_exp,) containing integers representing the
-        additional experience per choice which is admissible. This is the difference
-        between the maximum experience and minimum of initial experience per choice.
-    experiences : None or numpy.ndarray, default None
-        Array with shape (n_choices_w_exp,) which contains current experience of state.
-    pos : int, default 0
-        Index for current choice with experience. If index is valid for array
-        ``experiences``, then loop over all admissible experience levels of this choice.
-        Otherwise, ``experiences[pos]`` would lead to an :exc:`IndexError`.
+        Array with shape (n_choices_w_exp,) containing the additional experience per
+        choice which is admissible.
+    max_total_exp : int
+        Maximum of total experience accumulated over all choices.
+    n_states : int
+        Number of admissible experience vectors which is computed by
+        :func:`_count_experiences_per_period`.
+
+    Returns
+    -------
+    experiences : numpy.ndarray
+        Array with shape (n_states, n_choices_w_exp).
 
     """
-    # Return experiences combined with lagged choices and types.
-    yield experiences
-
-    # Check if there is an additional choice left to start another loop.
-    if pos < experiences.shape[0]:
-        # Upper bound of additional experience is given by the remaining time or the
-        # maximum experience which can be accumulated in experience[pos].
-        remaining_time = period - experiences.sum()
-        max_experience = additional_exp[pos]
-
-        # +1 is necessary so that the remaining time or max_experience is exhausted.
-        for i in np.arange(min(remaining_time, max_experience) + 1, dtype=np.uint8):
-            # Update experiences and call the same function with the next choice.
-            updated_experiences = experiences.copy()
-            updated_experiences[pos] += i
-            yield from _create_core_state_space_per_period(
-                period, additional_exp, optim_paras, updated_experiences, pos + 1
-            )
+    n_choices_w_exp = additional_exp.shape[0]
+    experiences = np.zeros((n_states, n_choices_w_exp), dtype=np.uint8)
+
+    current = np.zeros(n_choices_w_exp, dtype=np.int64)
+    total = 0
+
+    for i in range(n_states):
+        experiences[i] = current
+
+        for pos in range(n_choices_w_exp - 1, -1, -1):
+            if current[pos] < additional_exp[pos] and total < max_total_exp:
+                current[pos] += 1
+                total += 1
+                break
+            else:
+                total -= current[pos]
+                current[pos] = 0
+
+    return experiences
 
 
-def _add_lagged_choice_to_core_state_space(df, optim_paras):
+def _add_lagged_choice_to_core_state_space(df, optim_paras, options):
+    """Add lagged choices to the core state space and filter states.
+
+    The core state space is duplicated for every combination of lagged choices. The
+    filters are applied to each duplicate separately such that inadmissible states are
+    never materialized for all combinations of lagged choices at once.
+
+    """
+    lagged_choice_cols = [
+        f"lagged_choice_{lag}" for lag in range(1, optim_paras["n_lagged_choices"] + 1)
+    ]
+    lagged_choices_combinations = itertools.product(
+        range(len(optim_paras["choices"])), repeat=len(lagged_choice_cols)
+    )
+
     container = []
-    for lag in range(1, optim_paras["n_lagged_choices"] + 1):
-        for choice_code in range(len(optim_paras["choices"])):
-            df_ = df.copy()
-            df_[f"lagged_choice_{lag}"] = choice_code
-            container.append(df_)
+    for lagged_choices in lagged_choices_combinations:
+        df_ = df.assign(**dict(zip(lagged_choice_cols, lagged_choices)))
+        df_ = _filter_core_state_space(df_, options)
+        container.append(df_)
 
-    df = pd.concat(container, axis="rows", sort=False) if container else df
+    df = pd.concat(container, axis="rows", sort=False)
 
     return df
 
@@ -602,10 +1078,9 @@ def _filter_core_state_space(df, options):
     options : dict
 
     """
-    for definition in options["core_state_space_filters"]:
-        df = df.loc[~df.eval(definition)]
+    is_inadmissible = options["compiled_core_state_space_filters"](df)
 
-    return df
+    return df.loc[~is_inadmissible]
 
 
 def _add_initial_experiences_to_core_state_space(df, optim_paras):
@@ -613,8 +1088,12 @@ def _add_initial_experiences_to_core_state_space(df, optim_paras):
 
     As the core state space abstracts from differences in initial experiences, this
     function loops through all combinations from initial experiences and adds them to
-    existing experiences. After that, we need to check whether the maximum in
-    experiences is still binding.
+    existing experiences. Only states for which the maximum experience is still binding
+    are selected.
+
+    Different combinations of initial experiences can lead to the same state. To avoid
+    creating duplicates, each state is encoded as an integer and only states which have
+    not been created by a previous combination of initial experiences are kept.
 
     """
     choices = optim_paras["choices"]
@@ -624,25 +1103,39 @@ def _add_initial_experiences_to_core_state_space(df, optim_paras):
     )
 
     maximum_exp = np.array(
-        [choices[choice]["max"] for choice in optim_paras["choices_w_exp"]]
+        [choices[choice]["max"] for choice in optim_paras["choices_w_exp"]],
+        dtype=np.int64,
     )
 
     exp_cols = df.filter(like="exp_").columns.tolist()
+    experiences = df[exp_cols].to_numpy(dtype=np.int64)
+
+    states = df.to_numpy(dtype=np.int64)
+    exp_positions = [df.columns.get_loc(col) for col in exp_cols]
+    shape = create_core_state_space_shape(optim_paras)
 
     container = []
+    existing_states = np.empty(0, dtype=np.int64)
 
     for initial_exp in initial_experiences_combinations:
-        df_ = df.copy()
+        # Check that max_experience is still fulfilled.
+        is_below_max = (experiences + initial_exp <= maximum_exp).all(axis=1)
+        indices = np.flatnonzero(is_below_max)
+
+        # Discard states created by previous combinations of initial experiences.
+        states_ = states[indices]
+        states_[:, exp_positions] += np.array(initial_exp, dtype=np.int64)
+        codes = np.ravel_multi_index(states_.T, shape)
+        is_new = ~np.isin(codes, existing_states, assume_unique=True)
+        existing_states = np.union1d(existing_states, codes[is_new])
 
         # Add initial experiences.
+        df_ = df.iloc[indices[is_new]].copy()
         df_[exp_cols] += initial_exp
 
-        # Check that max_experience is still fulfilled.
-        df_ = df_.loc[df_[exp_cols].le(maximum_exp).all(axis="columns")].copy()
-
         container.append(df_)
 
-    df = pd.concat(container, axis="rows", sort=False).drop_duplicates()
+    df = pd.concat(container, axis="rows", sort=False)
 
     return df
 
@@ -695,16 +1188,19 @@ def _create_dense_state_space_covariates(dense_grid, optim_paras, options):
 
 
 def create_is_inadmissible(df, optim_paras, options):
-    """Compute is_inadmissible for passed states."""
+    """Compute is_inadmissible for passed states.
+
+    The restrictions of each choice are evaluated with the predicates compiled from
+    ``options["negative_choice_set"]``. Restrictions which depend on variables which are
+    not in ``df`` are skipped.
+
+    """
     df = df.copy()
 
     for choice in optim_paras["choices"]:
-        df[f"_{choice}"] = False
-        for formula in options["negative_choice_set"][choice]:
-            try:
-                df[f"_{choice}"] |= df.eval(formula)
-            except pd.core.computation.ops.UndefinedVariableError:
-                pass
+        df[f"_{choice}"] = options["compiled_negative_choice_set"][choice](
+            df, skip_undefined=True
+        )
 
     return df
 
@@ -712,28 +1208,81 @@ def create_is_inadmissible(df, optim_paras, options):
 def _create_indexer(core, core_key_to_core_indices, optim_paras):
     """Create indexer of core state space.
 
+    Each core state is encoded as an integer with a mixed-radix scheme where the radix
+    of a dimension is the number of its possible values (see
+    :func:`~respy.shared.encode_core_states`). The indexer stores the sorted codes of
+    all core states and, aligned with them, the core key and the core index of each
+    state.
+
+    If the space of all possible codes is not much larger than the number of states,
+    the indexer also contains a flat table which maps every possible code to the
+    position of the state in the sorted codes. Then, looking up a state is a single
+    gather operation. Otherwise, states are looked up with a binary search.
+
     Returns
     -------
-    indexer :  numba.typed.Dict
-        Maps a row of the core state space into its position within the
-        period_choice_cores. c: core_state -> (core_key,core_index)
+    indexer : dict
+        Contains the shape of the mixed-radix encoding (``"shape"``), the sorted codes
+        of the core states (``"codes"``), the core keys (``"core_key"``) and core
+        indices (``"core_index"``) aligned with the codes, and the optional lookup
+        table (``"positions"``). The indexer maps c: core_state -> (core_key,
+        core_index).
 
     """
     core_columns = ["period"] + create_core_state_space_columns(optim_paras)
-    n_core_state_variables = len(core_columns)
+    shape = create_core_state_space_shape(optim_paras)
+
+    core_keys = np.array(list(core_key_to_core_indices), dtype=np.int64)
+    n_states_per_key = np.array(
+        [len(indices) for indices in core_key_to_core_indices.values()], dtype=np.int64
+    )
+    indices = np.concatenate(list(core_key_to_core_indices.values())).astype(np.int64)
+
+    # Core keys and core indices are stored with the smallest possible dtype.
+    dtype = get_smallest_integer_dtype(
+        max(core_keys.shape[0], n_states_per_key.max(initial=0))
+    )
 
-    indexer = Dict.empty(
-        key_type=nb.types.UniTuple(nb.types.int64, n_core_state_variables),
-        value_type=nb.types.UniTuple(nb.types.int64, 2),
+    core_key = np.repeat(core_keys, n_states_per_key)
+    offsets = np.repeat(
+        np.cumsum(n_states_per_key) - n_states_per_key, n_states_per_key
     )
+    core_index = np.arange(indices.shape[0], dtype=np.int64) - offsets
+
+    states = core.loc[indices, core_columns].to_numpy(dtype=np.int64)
+    codes = np.ravel_multi_index(states.T, shape)
+
+    sorter = np.argsort(codes, kind="stable")
+    codes = codes[sorter]
+
+    n_codes = np.prod(shape, dtype=np.int64)
+    if n_codes <= INDEXER_MAX_SPARSITY * max(codes.shape[0], 1):
+        positions = np.full(n_codes, INDEXER_INVALID_INDEX, dtype=INDEXER_DTYPE)
+        positions[codes] = np.arange(codes.shape[0])
+    else:
+        positions = None
+
+    indexer = {
+        "shape": shape,
+        "codes": codes,
+        "core_key": core_key[sorter].astype(dtype),
+        "core_index": core_index[sorter].astype(dtype),
+        "positions": positions,
+    }
 
-    for core_idx, indices in core_key_to_core_indices.items():
-        states = core.loc[indices, core_columns].to_numpy()
-        for i, state in enumerate(states):
-            indexer[tuple(state)] = (core_idx, i)
     return indexer
 
 
+def _collect_variables_of_choice_restrictions(options):
+    """Collect the variables used in the choice restrictions."""
+    return set().union(
+        *[
+            predicate.variables
+            for predicate in options["compiled_negative_choice_set"].values()
+        ]
+    )
+
+
 def _create_core_period_choice(core, optim_paras, options):
     """Create the core separated into period-choice cores.
 
@@ -754,14 +1303,76 @@ def _create_core_period_choice(core, optim_paras, options):
     return core_period_choice
 
 
-def _create_dense_period_choice(
-    core, dense, core_key_to_core_indices, core_key_to_complex, optim_paras, options
-):
+def _create_period_choice_cores(core, dense, optim_paras, options):
+    """Create the period choice cores and dense period choice cores.
+
+    The core is split into periods which are processed by
+    :func:`_create_period_choice_cores_of_period` in parallel with
+    ``options["state_space_n_workers"]`` processes. The results are combined such that
+    core keys are ordered by period and choice set and dense keys by dense index and
+    core key.
+
+    Returns
+    -------
+    core_period_choice : dict
+        c: (period, choice_set) -> core_indices
+    dense_period_choice : dict
+        d: (period, choice_set, dense_index) -> core_key
+
+    """
+    period_to_core = {int(period): df for period, df in core.groupby("period")}
+
+    (
+        period_to_core_period_choice,
+        period_to_dense_period_choice,
+    ) = _create_period_choice_cores_of_period(
+        period_to_core,
+        dense,
+        optim_paras,
+        options,
+        n_jobs=options["state_space_n_workers"],
+    )
+
+    core_period_choice = {}
+    dense_period_choice = {}
+    for period in sorted(period_to_core):
+        core_period_choice.update(period_to_core_period_choice[period])
+        dense_period_choice.update(period_to_dense_period_choice[period])
+
+    complex_to_core_key = {complex_: i for i, complex_ in enumerate(core_period_choice)}
+    dense_period_choice = {
+        complex_: complex_to_core_key[core_complex]
+        for complex_, core_complex in dense_period_choice.items()
+    }
+    dense_period_choice = dict(
+        sorted(dense_period_choice.items(), key=lambda x: (x[0][2:], x[1]))
+    )
+
+    return core_period_choice, dense_period_choice
+
+
+@parallelize_across_dense_dimensions
+def _create_period_choice_cores_of_period(core, dense, optim_paras, options):
+    """Create the period choice cores and dense period choice cores of one period.
+
+    The states of each period choice core are dumped to the cache.
+
+    """
+    core_period_choice = _create_core_period_choice(core, optim_paras, options)
+    dense_period_choice = _create_dense_period_choice(
+        core, dense, core_period_choice, optim_paras, options
+    )
+
+    return core_period_choice, dense_period_choice
+
+
+def _create_dense_period_choice(core, dense, core_period_choice, optim_paras, options):
     """Create dense period choice parts of the state space.
 
-    We loop over all dense combinations and calculate choice restrictions for each
-    particular dense state space. The information allows us to compile a dict that maps
-    a combination of period, choice_set and dense_index into core_key!
+    The core is combined with all dense combinations at once and the choice
+    restrictions are evaluated on the product of core and dense states. The information
+    allows us to compile a dict that maps a combination of period, choice_set and
+    dense_index into the period and choice set of the core!
 
     Note that we do not allow for choice restrictions that interact between core and
     dense covariates. In order to do so we would have to rewrite this function and
@@ -770,58 +1381,136 @@ def _create_dense_period_choice(
     Returns
     -------
     dense_period_choice : dict
-        d: (period, choice_set, dense_index) -> core_key
+        d: (period, choice_set, dense_index) -> (period, choice_set)
 
     """
+    # The states of a core key are stored once and shared by all dense keys.
+    for complex_, indices in core_period_choice.items():
+        dump_objects(core.loc[indices], "states", complex_, options)
+
     if not dense:
-        for key, complex_ in core_key_to_complex.items():
-            dump_objects(
-                core.loc[core_key_to_core_indices[key]], "states", complex_, options
-            )
-        dense_period_choice = {k: i for i, k in core_key_to_complex.items()}
+        dense_period_choice = {complex_: complex_ for complex_ in core_period_choice}
     else:
         choices = [f"_{choice}" for choice in optim_paras["choices"]]
+        core_complexes = list(core_period_choice)
+
+        # Only the covariates and core columns used by the choice restrictions are
+        # needed to evaluate them.
+        covariates = identify_necessary_covariates(
+            _collect_variables_of_choice_restrictions(options),
+            options["covariates_all"],
+        )
+        variables = set().union(
+            _collect_variables_of_choice_restrictions(options),
+            *[covariate["depends_on"] for covariate in covariates.values()],
+        )
+        core_columns = [
+            column for column in core.columns if column in variables.union(covariates)
+        ]
+
+        # Order the product of core and dense states by dense index, core key and the
+        # position of the state in the core key such that every dense key is a block.
+        core_positions = core.index.get_indexer(
+            np.concatenate(list(core_period_choice.values()))
+        )
+        states = core[core_columns].iloc[np.tile(core_positions, len(dense))].copy()
+        for column, values in pd.DataFrame(list(dense.values())).items():
+            states[column] = np.repeat(values.to_numpy(), len(core_positions))
+
+        states = compute_covariates(states, covariates)
+        states = create_is_inadmissible(states, optim_paras, options)
+        states[choices] = ~states[choices]
+
+        n_states = np.tile(
+            [len(indices) for indices in core_period_choice.values()], len(dense)
+        )
+        ends = np.cumsum(n_states)
+        starts = ends - n_states
+
+        is_admissible = states[choices].to_numpy()
+        choice_sets = is_admissible[starts]
+        has_choice_set = (
+            is_admissible == np.repeat(choice_sets, n_states, axis=0)
+        ).all(axis=1)
+        if not np.logical_and.reduceat(has_choice_set, starts).all():
+            raise ValueError(
+                "Choice restrictions cannot interact between core and dense "
+                "information such that heterogeneous choice sets within a "
+                "period are created. Use penalties in the utility functions "
+                "for that."
+            )
+
         dense_period_choice = {}
-        for dense_idx, (_, dense_vec) in enumerate(dense.items()):
-            states = core.copy().assign(**dense_vec)
-            states = compute_covariates(states, options["covariates_all"])
-
-            states = create_is_inadmissible(states, optim_paras, options)
-            for core_idx, indices in core_key_to_core_indices.items():
-                df = states.copy().loc[indices].assign(**dense_vec)
-                df[choices] = ~df[choices]
-                grouper = df.groupby(choices).groups
-                if not len(grouper) == 1:
-                    raise ValueError(
-                        "Choice restrictions cannot interact between core and dense "
-                        "information such that heterogeneous choice sets within a "
-                        "period are created. Use penalties in the utility functions "
-                        "for that."
-                    )
-                period_choice = {
-                    (core_key_to_complex[core_idx][0], idx, dense_idx): core_idx
-                    for idx, indices in grouper.items()
-                }
-
-                dense_period_choice = {**dense_period_choice, **period_choice}
-                idx = list(grouper.keys())[0]
-                dump_objects(
-                    df,
-                    "states",
-                    (core_key_to_complex[core_idx][0], idx, dense_idx),
-                    options,
-                )
+        for i in range(len(starts)):
+            dense_idx, position = divmod(i, len(core_complexes))
+            core_complex = core_complexes[position]
+            complex_ = (core_complex[0], tuple(choice_sets[i].tolist()), dense_idx)
+            dense_period_choice[complex_] = core_complex
 
     return dense_period_choice
 
 
+def create_reward_covariate_labels(optim_paras):
+    """Create the labels of all covariates of wages and non-pecuniary rewards."""
+    labels = []
+    for choice in optim_paras["choices"]:
+        for reward in ["wage", "nonpec"]:
+            if f"{reward}_{choice}" in optim_paras:
+                labels += optim_paras[f"{reward}_{choice}"].index.tolist()
+
+    return list(dict.fromkeys(labels))
+
+
+@parallelize_across_dense_dimensions
+def _create_core_reward_covariates(complex_, labels, options):
+    """Create the matrix of reward covariates which only depend on the core."""
+    states = load_objects("states", complex_, options)
+    covariates = np.ascontiguousarray(states[labels].to_numpy(dtype=np.float64))
+
+    if options["solution_out_of_core"]:
+        covariates = create_memory_map(
+            covariates, "core_reward_covariates", complex_, options
+        )
+
+    return covariates
+
+
+@parallelize_across_dense_dimensions
+def _create_dense_reward_covariates(
+    complex_, core_complex, dense_variables, labels, options
+):
+    """Create the matrix of reward covariates which depend on dense information.
+
+    Only the covariates which are necessary for the labels are computed. Without such
+    covariates, :obj:`None` is returned.
+
+    """
+    if labels:
+        states = load_states(
+            core_complex,
+            dense_variables,
+            options,
+            identify_necessary_covariates(labels, options["covariates_all"]),
+        )
+        covariates = np.ascontiguousarray(states[labels].to_numpy(dtype=np.float64))
+
+        if options["solution_out_of_core"]:
+            covariates = create_memory_map(
+                covariates, "dense_reward_covariates", complex_, options
+            )
+    else:
+        covariates = None
+
+    return covariates
+
+
 @parallelize_across_dense_dimensions
 def _get_continuation_values(
     dense_complex_index,
     choice_set,
     core_indices,
     child_indices,
-    core_index_and_dense_vector_to_dense_index,
+    core_key_and_dense_index_to_dense_key,
     expected_value_functions,
 ):
     """Get continuation values from child states.
@@ -832,6 +1521,13 @@ def _get_continuation_values(
     choice combinations by using the child indices created in
     :func:`_collect_child_indices`.
 
+    The dense keys of the child states are gathered from the lookup table and the
+    expected value functions are collected for all children with the same dense key at
+    once.
+
+    Expected value functions can have leading axes, e.g., for parameter vectors, which
+    are kept in the continuation values.
+
     Returns
     -------
     continuation_values : numpy.ndarray
@@ -847,22 +1543,28 @@ def _get_continuation_values(
 
     n_choices = sum_over_numba_boolean_unituple(choice_set)
 
-    n_states = core_indices.shape[0]
+    child_dense_keys = core_key_and_dense_index_to_dense_key[
+        child_indices[:, :, 0], dense_idx
+    ]
+    child_core_indices = child_indices[:, :, 1]
 
-    continuation_values = np.zeros((len(core_indices), n_choices))
-    for i in range(n_states):
-        for j in range(n_choices):
-            core_idx, row_idx = child_indices[i, j]
-            idx = (core_idx, dense_idx)
-            dense_choice = core_index_and_dense_vector_to_dense_index[idx]
+    child_dense_keys_unique = np.unique(child_dense_keys)
+    leading_shape = expected_value_functions[child_dense_keys_unique[0]].shape[:-1]
 
-            continuation_values[i, j] = expected_value_functions[dense_choice][row_idx]
+    continuation_values = np.zeros(leading_shape + (len(core_indices), n_choices))
+    for dense_key in child_dense_keys_unique:
+        is_child = child_dense_keys == dense_key
+        continuation_values[..., is_child] = expected_value_functions[dense_key][
+            ..., child_core_indices[is_child]
+        ]
 
     return continuation_values
 
 
 @parallelize_across_dense_dimensions
-def _collect_child_indices(complex_, choice_set, indexer, optim_paras, options):
+def _collect_child_indices(
+    complex_, core_complex, choice_set, indexer, optim_paras, options
+):
     """Collect child indices for states.
 
     The function takes the states of one dense key, applies the law of motion for each
@@ -872,10 +1574,13 @@ def _collect_child_indices(complex_, choice_set, indexer, optim_paras, options):
     ----------
     complex_ : tuple
         See :ref:`complex`.
+    core_complex : tuple
+        The complex of the core key of the dense key under which the states are stored.
     choice_set : tuple
         Tuple representing admissible choices
-    indexer : numba.typed.Dict
-        A dictionary with core states as keys and the core key and core index as values.
+    indexer : dict
+        A dictionary which maps encoded core states to the core key and core index. See
+        :func:`_create_indexer`.
     optim_paras : dict
         Contains model parameters.
     options : dict
@@ -884,27 +1589,108 @@ def _collect_child_indices(complex_, choice_set, indexer, optim_paras, options):
     Returns
     -------
     indices : numpy.ndarray
-        Array with shape ``(n_states, n_choices * 2)``. Represents the mapping
-        (core_index, choice) -> (dense_key, core_index).
+        Array with shape ``(n_states, n_choices, 2)``. Represents the mapping
+        (core_index, choice) -> (core_key, core_index). The dtype is the smallest
+        integer dtype of the indexer.
 
     """
     core_columns = create_core_state_space_columns(optim_paras)
-    states = load_objects("states", complex_, options)
+    states = load_objects("states", core_complex, options)
+    states = states[["period"] + core_columns].to_numpy(dtype=np.int64)
 
-    n_choices = sum(choice_set)
-    indices = np.full((states.shape[0], n_choices, 2), -1, dtype=np.int64)
+    choices = np.array([i for i, is_valid in enumerate(choice_set) if is_valid])
+    shape = np.array(indexer["shape"], dtype=np.int64)
 
-    indices_valid_choices = [i for i, is_valid in enumerate(choice_set) if is_valid]
-    for i, choice in enumerate(indices_valid_choices):
-        states_ = states.copy(deep=True)
+    codes = _encode_child_states(
+        states, choices, shape, len(optim_paras["choices_w_exp"])
+    )
+    core_key, core_index, is_valid = map_codes_to_core_key_and_core_index(
+        codes, indexer
+    )
 
-        states_["choice"] = choice
-        states_ = apply_law_of_motion_for_core(states_, optim_paras)
+    if not is_valid.all():
+        rows, columns = np.nonzero(~is_valid)
+        raise KeyError(
+            f"The child states of the states {states[rows][:5].tolist()} for the "
+            f"choices {choices[columns][:5].tolist()} are not part of the core state "
+            "space."
+        )
 
-        states_ = states_[["period"] + core_columns]
+    indices = np.empty(core_key.shape + (2,), dtype=indexer["core_key"].dtype)
+    indices[:, :, 0] = core_key
+    indices[:, :, 1] = core_index
 
-        indices[:, i, 0], indices[:, i, 1] = map_states_to_core_key_and_core_index(
-            states_.to_numpy(), indexer
-        )
+    if options["solution_out_of_core"]:
+        indices = create_memory_map(indices, "child_indices", complex_, options)
 
     return indices
+
+
+@nb.njit
+def _encode_child_states(states, choices, shape, n_choices_w_exp):
+    """Encode the child states of states for every choice.
+
+    The function applies the law of motion for the core dimensions like
+    :func:`~respy.shared.apply_law_of_motion_for_core` and encodes the resulting states
+    like :func:`~respy.shared.encode_core_states` in a single pass. The period is
+    incremented, the experience of the choice is incremented and the lagged choices are
+    shifted such that the choice becomes the first lagged choice.
+
+    Parameters
+    ----------
+    states : numpy.ndarray
+        Array with shape (n_states, n_core_dimensions) containing the period followed by
+        the columns of :func:`~respy.shared.create_core_state_space_columns`.
+    choices : numpy.ndarray
+        Array with shape (n_choices,) containing the integer-encoded choices.
+    shape : numpy.ndarray
+        The number of possible values of each core dimension. See
+        :func:`~respy.shared.create_core_state_space_shape`.
+    n_choices_w_exp : int
+        Number of choices with experience which are the first choices.
+
+    Returns
+    -------
+    codes : numpy.ndarray
+        Array with shape (n_states, n_choices) containing the codes of the child states.
+        Child states outside of the shape receive
+        :data:`~respy.config.INDEXER_INVALID_INDEX`.
+
+    """
+    n_states, n_dimensions = states.shape
+    n_lags = n_dimensions - 1 - n_choices_w_exp
+    first_lag = 1 + n_choices_w_exp
+
+    strides = np.ones(n_dimensions, dtype=np.int64)
+    for dim in range(n_dimensions - 2, -1, -1):
+        strides[dim] = strides[dim + 1] * shape[dim + 1]
+
+    codes = np.full((n_states, choices.shape[0]), INDEXER_INVALID_INDEX, np.int64)
+
+    for i in range(n_states):
+        is_valid = states[i, 0] + 1 < shape[0]
+        code = (states[i, 0] + 1) * strides[0]
+
+        for dim in range(1, first_lag):
+            code += states[i, dim] * strides[dim]
+
+        # The oldest lagged choice is dropped and the others move one position back.
+        for dim in range(first_lag + 1, n_dimensions):
+            code += states[i, dim - 1] * strides[dim]
+
+        for j in range(choices.shape[0]):
+            choice = choices[j]
+            child_code = code
+            is_child_valid = is_valid
+
+            if choice < n_choices_w_exp:
+                is_child_valid &= states[i, 1 + choice] + 1 < shape[1 + choice]
+                child_code += strides[1 + choice]
+
+            if n_lags:
+                child_code += choice * strides[first_lag]
+
+            if is_child_valid:
+                codes[i, j] = child_code
+
+    return codes
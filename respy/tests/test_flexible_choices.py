@@ -58,3 +58,19 @@ def test_simulation_with_flexible_choice_sets():
     df = simulate(params)
 
     assert isinstance(df, pd.DataFrame)
+
+
+@pytest.mark.integration
+def test_choice_restrictions_interacting_between_core_and_dense_raise_error():
+    params, options = process_model_or_seed("robinson_crusoe_basic")
+
+    # Extend with observable characteristic.
+    params.loc[("observable_health_well", "probability"), "value"] = 0.9
+    params.loc[("observable_health_sick", "probability"), "value"] = 0.1
+
+    # Sick people with experience in fishing cannot fish.
+    options["negative_choice_set"] = {"fishing": ["health == 'sick' & exp_fishing > 0"]}
+    optim_paras, options = process_params_and_options(params, options)
+
+    with pytest.raises(ValueError, match="Choice restrictions cannot interact"):
+        create_state_space_class(optim_paras, options)
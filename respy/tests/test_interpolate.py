@@ -1,5 +1,6 @@
 from itertools import count
 
+import numpy as np
 import pytest
 
 from respy.interpolate import _split_interpolation_points_evenly
@@ -17,6 +18,23 @@ def test_run_through_of_solve_with_interpolation(seed):
     solve(params)
 
 
+@pytest.mark.end_to_end
+def test_run_through_of_solve_with_interpolation_and_quadrature():
+    params, options = process_model_or_seed("kw_94_one")
+    options = {
+        **options,
+        "n_periods": 5,
+        "interpolation_points": 10,
+        "solution_integration": "gauss_hermite",
+    }
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    for value in state_space.expected_value_functions.values():
+        assert np.isfinite(value).all()
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "dense_index_to_n_states, interpolation_points",
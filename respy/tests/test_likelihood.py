@@ -1,3 +1,5 @@
+import functools
+
 import hypothesis.strategies as st
 import numpy as np
 import pandas as pd
@@ -67,3 +69,29 @@ def test_logsumexp(array):
     result = _logsumexp(array)
 
     np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.integration
+def test_log_like_reuses_solution_if_only_type_probabilities_change():
+    params, options = process_model_or_seed("kw_97_basic")
+    options["n_periods"] = 3
+    df = get_simulate_func(params, options)(params)
+
+    log_like = get_log_like_func(params, options, df, return_scalar=False)
+    solve = log_like.keywords["solve"]
+    n_solutions = []
+
+    def count_solutions(params):
+        n_solutions.append(1)
+        return solve(params)
+
+    log_like = functools.partial(log_like, solve=count_solutions)
+    log_like(params)
+
+    params.loc[("type_2", "up_to_nine_years_school"), "value"] += 1
+    contribs = log_like(params)
+
+    assert len(n_solutions) == 1
+    np.testing.assert_array_equal(
+        contribs, get_log_like_func(params, options, df, return_scalar=False)(params)
+    )
@@ -45,6 +45,15 @@ def test_model_options(model_or_seed):
     validate_options(options)
 
 
+@pytest.mark.unit
+def test_raise_exception_for_solution_cache_out_of_core():
+    params, options = process_model_or_seed("kw_94_one")
+    options = {**options, "solution_out_of_core": True, "solution_cache_size": 1}
+
+    with pytest.raises(AssertionError, match=r"Solutions cannot be cached"):
+        process_params_and_options(params, options)
+
+
 @pytest.mark.unit
 @pytest.mark.precise
 def test_parse_initial_and_max_experience():
@@ -259,3 +268,33 @@ def test_add_default_is_inadmissible(optim_paras, expected):
     options = {"negative_choice_set": {}}
     result = _add_default_is_inadmissible(options, optim_paras)
     assert result == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("model", EXAMPLE_MODELS)
+def test_state_space_key_does_not_depend_on_parameter_values(model):
+    params, options = process_model_or_seed(model)
+    _, options_ = process_params_and_options(params, options)
+
+    params_ = params.copy()
+    is_utility = params_.index.get_level_values("category").str.contains(
+        "^wage_|^nonpec_"
+    )
+    params_.loc[is_utility, "value"] += np.random.normal(size=is_utility.sum())
+    _, options_with_other_values = process_params_and_options(params_, options)
+
+    # Processed options can be processed again.
+    _, options_processed_twice = process_params_and_options(params, options_)
+
+    assert (
+        options_["state_space_key"]
+        == options_with_other_values["state_space_key"]
+        == options_processed_twice["state_space_key"]
+    )
+
+    options["n_periods"] += 1
+    _, options_with_other_structure = process_params_and_options(params, options)
+
+    assert (
+        options_["state_space_key"] != options_with_other_structure["state_space_key"]
+    )
@@ -0,0 +1,81 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from respy.pre_processing.process_formulas import Predicate
+
+
+FORMULAS = [
+    "False",
+    "True",
+    "period < 2",
+    "exp_a == 0",
+    "period > 0 and exp_a + exp_b == period and lagged_choice_1 == 2",
+    "period > 0 & exp_a == period & lagged_choice_1 != 0",
+    "period <= 2 | exp_b != 0",
+    "not period == 2",
+    "~(exp_a > exp_b)",
+    "1 < exp_a <= period",
+    "lagged_choice_1 in [0, 2]",
+    "lagged_choice_1 not in [1]",
+    "exp_a * 2 > period - 1",
+]
+
+
+@pytest.fixture(scope="module")
+def states():
+    rng = np.random.RandomState(0)
+    period = rng.randint(0, 10, size=1_000)
+    exp_a = (period * rng.uniform(size=1_000)).astype(int)
+    exp_b = ((period - exp_a) * rng.uniform(size=1_000)).astype(int)
+
+    return pd.DataFrame(
+        {
+            "period": period,
+            "exp_a": exp_a,
+            "exp_b": exp_b,
+            "lagged_choice_1": rng.randint(0, 3, size=1_000),
+        }
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.precise
+@pytest.mark.parametrize("formula", FORMULAS)
+def test_predicate_is_equal_to_pandas_eval(states, formula):
+    expected = np.broadcast_to(np.asarray(states.eval(formula)), states.shape[0])
+    result = Predicate([formula])(states)
+
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.unit
+@pytest.mark.precise
+def test_predicate_fuses_formulas_and_skips_undefined_variables(states):
+    predicate = Predicate(FORMULAS[2:] + ["type == 1"])
+
+    expected = np.logical_or.reduce([states.eval(formula) for formula in FORMULAS[2:]])
+    result = predicate(states, skip_undefined=True)
+
+    np.testing.assert_array_equal(result, expected)
+
+    with pytest.raises(NameError):
+        predicate(states)
+
+
+@pytest.mark.unit
+def test_predicate_can_be_pickled(states):
+    predicate = Predicate(FORMULAS)
+    unpickled = pickle.loads(pickle.dumps(predicate))
+
+    assert unpickled == predicate
+    np.testing.assert_array_equal(unpickled(states), predicate(states))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("formula", ["exp_a.sum() > 1", "period >", "lambda: 1"])
+def test_predicate_raises_error_for_unsupported_formulas(formula):
+    with pytest.raises(ValueError, match="The formula"):
+        Predicate([formula])
@@ -1,17 +1,53 @@
+import itertools
+import multiprocessing
+import os
+import subprocess
+import sys
+
 import numpy as np
+import pandas as pd
 import pytest
 
+from respy import solve as rp_solve
+from respy import state_space as rp_state_space
 from respy.config import EXAMPLE_MODELS
 from respy.config import INDEXER_INVALID_INDEX
 from respy.config import KEANE_WOLPIN_1994_MODELS
 from respy.config import KEANE_WOLPIN_1997_MODELS
 from respy.pre_processing.model_checking import check_model_solution
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.shared import _ObjectCache
+from respy.shared import apply_law_of_motion_for_core
+from respy.shared import calculate_analytic_expected_value_function
+from respy.shared import calculate_expected_value_functions
+from respy.shared import clear_object_cache
+from respy.shared import create_base_nodes_and_weights
 from respy.shared import create_core_state_space_columns
+from respy.shared import create_core_state_space_shape
+from respy.shared import create_dense_state_space_columns
+from respy.shared import create_run_id
+from respy.shared import encode_core_states
+from respy.shared import get_cache_directory
+from respy.shared import get_object_cache_info
+from respy.shared import get_run_directory
+from respy.shared import load_objects
+from respy.shared import load_states
+from respy.shared import map_states_to_core_key_and_core_index
+from respy.shared import pandas_dot
+from respy.shared import select_valid_choices
+from respy.solve import _concatenate_inputs_of_dense_keys
+from respy.solve import _full_solution
+from respy.solve import _full_solution_of_batch
+from respy.solve import get_batch_solve_func
 from respy.solve import get_solve_func
+from respy.solve import get_state_space_size
+from respy.state_space import _count_experiences_per_period
+from respy.state_space import _create_core_from_choice_experiences
 from respy.state_space import _create_core_period_choice
 from respy.state_space import _create_core_state_space
 from respy.state_space import _create_indexer
+from respy.state_space import _encode_child_states
+from respy.state_space import _enumerate_experiences
 from respy.state_space import create_state_space_class
 from respy.tests._former_code import _create_state_space_kw94
 from respy.tests._former_code import _create_state_space_kw97_base
@@ -35,6 +71,426 @@ def test_check_solution(model_or_seed):
     check_model_solution(optim_paras, options, state_space)
 
 
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", EXAMPLE_MODELS)
+def test_solution_with_cached_state_space(model_or_seed, monkeypatch):
+    """A state space loaded from the cache yields the same solution."""
+    params, options = process_model_or_seed(model_or_seed)
+    state_space = get_solve_func(params, options)(params)
+
+    # Fail if the state space is not loaded from the cache.
+    monkeypatch.setattr(rp_state_space, "_create_core_state_space", None)
+
+    cached_state_space = get_solve_func(params, options)(params)
+
+    np.testing.assert_array_equal(
+        state_space.core.to_numpy(), cached_state_space.core.to_numpy()
+    )
+    assert state_space.dense_key_to_complex == cached_state_space.dense_key_to_complex
+    for key, value in state_space.expected_value_functions.items():
+        np.testing.assert_array_equal(
+            value, cached_state_space.expected_value_functions[key]
+        )
+
+
+@pytest.mark.integration
+@pytest.mark.precise
+def test_cache_formats_yield_the_same_solution():
+    params, options = process_model_or_seed("kw_94_one")
+    state_spaces = {
+        cache_format: get_solve_func(params, {**options, "cache_format": cache_format})(
+            params
+        )
+        for cache_format in ["npy", "parquet"]
+    }
+
+    for key, value in state_spaces["npy"].expected_value_functions.items():
+        np.testing.assert_array_equal(
+            value, state_spaces["parquet"].expected_value_functions[key]
+        )
+
+    state_space = state_spaces["npy"]
+    complex_ = state_space.dense_key_to_complex[0]
+    states = load_objects("states", complex_, state_space.options)
+    expected = pd.read_parquet(
+        get_cache_directory(state_spaces["parquet"].options)
+        / f"states_{complex_[0]}_{''.join(str(int(x)) for x in complex_[1])}.parquet"
+    )
+
+    pd.testing.assert_frame_equal(states, expected)
+    # Memory-mapped columns are read-only.
+    assert not any(states[col].to_numpy().flags.writeable for col in states)
+
+
+@pytest.mark.unit
+@pytest.mark.precise
+@pytest.mark.parametrize("model_or_seed", EXAMPLE_MODELS)
+def test_encoded_child_states_are_equal_to_law_of_motion(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    optim_paras, options = process_params_and_options(params, options)
+
+    core = _create_core_state_space(optim_paras, options)
+    core = core.query("period < @optim_paras['n_periods'] - 1").copy()
+    columns = ["period"] + create_core_state_space_columns(optim_paras)
+    shape = create_core_state_space_shape(optim_paras)
+    choices = np.arange(len(optim_paras["choices"]))
+
+    codes = _encode_child_states(
+        core[columns].to_numpy(dtype=np.int64),
+        choices,
+        np.array(shape),
+        len(optim_paras["choices_w_exp"]),
+    )
+
+    for choice in choices:
+        core["choice"] = choice
+        children = apply_law_of_motion_for_core(core.copy(), optim_paras)
+        expected = encode_core_states(children[columns].to_numpy(), shape)
+        np.testing.assert_array_equal(codes[:, choice], expected)
+
+
+@pytest.mark.integration
+def test_get_attribute_from_period(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    optim_paras, options = process_params_and_options(params, options)
+    state_space = create_state_space_class(optim_paras, options)
+
+    for period in range(options["n_periods"]):
+        expected = {
+            key: value
+            for key, value in state_space.dense_key_to_choice_set.items()
+            if state_space.dense_key_to_complex[key][0] == period
+        }
+        result = state_space.get_attribute_from_period(
+            "dense_key_to_choice_set", period
+        )
+        assert result == expected
+        assert state_space.get_dense_keys_from_period(period) == list(expected)
+
+
+@pytest.mark.integration
+def test_state_space_size_is_equal_to_state_space(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    size = get_state_space_size(params, options)
+    state_space = get_solve_func(params, options)(params)
+
+    for period, row in size.iterrows():
+        dense_keys = state_space.get_dense_keys_from_period(period)
+        assert row["n_dense_keys"] == len(dense_keys)
+        assert row["n_states"] == sum(
+            len(state_space.dense_key_to_core_indices[key]) for key in dense_keys
+        )
+        assert row["wages"] == sum(state_space.wages[key].nbytes for key in dense_keys)
+        if state_space.child_indices is not None:
+            assert row["child_indices"] == sum(
+                state_space.child_indices[key].nbytes
+                for key in dense_keys
+                if key in state_space.child_indices
+            )
+        assert row["expected_value_functions"] == sum(
+            state_space.expected_value_functions[key].nbytes for key in dense_keys
+        )
+        core_keys = {state_space.dense_key_to_core_key[key] for key in dense_keys}
+        assert row["reward_covariates"] == sum(
+            state_space.core_key_to_reward_covariates[key].nbytes for key in core_keys
+        ) + sum(
+            state_space.dense_key_to_reward_covariates[key].nbytes
+            for key in dense_keys
+            if state_space.dense_key_to_reward_covariates[key] is not None
+        )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model", ["robinson_crusoe_basic", "kw_94_one"])
+@pytest.mark.parametrize(
+    "integration, interpolation_points",
+    [
+        ("monte_carlo", -1),
+        ("gauss_hermite", -1),
+        ("smolyak", -1),
+        ("analytic", -1),
+        ("analytic", 20),
+    ],
+)
+def test_state_space_size_counts_draws_of_integration(
+    model, integration, interpolation_points
+):
+    params, options = process_model_or_seed(model)
+    options = {
+        **options,
+        "n_periods": 6,
+        "solution_integration": integration,
+        "interpolation_points": interpolation_points,
+    }
+    size = get_state_space_size(params, options)
+    state_space = get_solve_func(params, options)(params)
+
+    for period, row in size.iterrows():
+        dense_keys = state_space.get_dense_keys_from_period(period)
+        assert row["draws"] == sum(
+            state_space.draws_emax_risk[key].nbytes
+            for key in dense_keys
+            if key in state_space.draws_emax_risk
+        )
+
+    if integration == "analytic" and interpolation_points == -1:
+        assert size["draws"].sum() == 0
+
+
+@pytest.mark.integration
+@pytest.mark.precise
+def test_out_of_core_solution_is_equal_to_solution_in_memory(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    state_space = get_solve_func(params, options)(params)
+
+    options = {**options, "solution_out_of_core": True}
+    for _ in range(2):
+        # The second iteration loads the state space from the cache.
+        out_of_core = get_solve_func(params, options)(params)
+
+        for key, value in state_space.expected_value_functions.items():
+            assert isinstance(out_of_core.expected_value_functions[key], np.memmap)
+            assert isinstance(out_of_core.wages[key], np.memmap)
+            np.testing.assert_array_equal(
+                value, out_of_core.expected_value_functions[key]
+            )
+        if state_space.child_indices is not None:
+            for key, value in state_space.child_indices.items():
+                assert isinstance(out_of_core.child_indices[key], np.memmap)
+                np.testing.assert_array_equal(value, out_of_core.child_indices[key])
+
+
+@pytest.mark.integration
+def test_memory_maps_of_previous_period_are_prefetched(monkeypatch):
+    params, options = process_model_or_seed("kw_94_one")
+    options = {**options, "n_periods": 4, "solution_out_of_core": True}
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    prefetched = []
+    monkeypatch.setattr(rp_solve, "prefetch_memory_map", prefetched.append)
+    params.loc[("delta", "delta"), "value"] -= 0.01
+    state_space = solve(params)
+
+    for period in range(options["n_periods"] - 1):
+        for attribute in ["wages", "nonpecs", "child_indices"]:
+            for array in state_space.get_attribute_from_period(
+                attribute, period
+            ).values():
+                assert any(array is array_ for array_ in prefetched)
+
+
+@pytest.mark.unit
+def test_out_of_core_solution_of_period_does_not_copy_rewards(tmp_path):
+    np.random.seed(0)
+    n_params = 2
+    shapes = {0: (5, 3), 1: (4, 2), 2: (6, 3)}
+
+    wages = {}
+    for key, shape in shapes.items():
+        wages[key] = np.lib.format.open_memmap(
+            tmp_path / f"{key}.npy", mode="w+", shape=(n_params, *shape)
+        )
+        wages[key][:] = np.random.randn(n_params, *shape)
+    nonpecs, continuation_values = [
+        {key: np.random.randn(n_params, *shape) for key, shape in shapes.items()}
+        for _ in range(2)
+    ]
+    draws = {
+        key: np.random.randn(n_params, 10, shape[1]) for key, shape in shapes.items()
+    }
+    delta = np.array([0.95, 0.9])
+
+    in_memory = _full_solution_of_batch(
+        wages, nonpecs, continuation_values, draws, delta
+    )
+    out_of_core = _full_solution_of_batch(
+        wages, nonpecs, continuation_values, draws, delta, out_of_core=True
+    )
+
+    for key in shapes:
+        np.testing.assert_array_equal(in_memory[key], out_of_core[key])
+        assert np.shares_memory(
+            _concatenate_inputs_of_dense_keys(wages, [key], n_params), wages[key]
+        )
+
+
+@pytest.mark.integration
+def test_states_are_stored_once_per_core_key():
+    params, options = process_model_or_seed(
+        "robinson_crusoe_with_observed_characteristics"
+    )
+    state_space = get_solve_func(params, options)(params)
+
+    directory = get_cache_directory(state_space.options)
+    assert len(list(directory.glob("states_*"))) == len(state_space.core_key_to_complex)
+    assert len(state_space.core_key_to_complex) < len(state_space.dense_key_to_complex)
+
+    for key in state_space.dense_key_to_complex:
+        states = load_states(
+            state_space.dense_key_to_core_complex[key],
+            state_space.dense_key_to_dense_variables[key],
+            state_space.options,
+        )
+        assert len(states) == len(state_space.dense_key_to_core_indices[key])
+        for column, value in zip(
+            create_dense_state_space_columns(state_space.optim_paras),
+            state_space.dense_key_to_dense_covariates[key],
+        ):
+            assert (states[column] == value).all()
+
+
+@pytest.mark.integration
+@pytest.mark.precise
+def test_state_space_built_in_parallel_is_equal_to_serial(tmp_path):
+    params, options = process_model_or_seed(
+        "robinson_crusoe_with_observed_characteristics"
+    )
+    state_space = get_solve_func(params, options)(params)
+
+    options = {**options, "state_space_n_workers": 2, "cache_path": tmp_path}
+    parallel = get_solve_func(params, options)(params)
+
+    assert parallel.dense_key_to_complex == state_space.dense_key_to_complex
+    assert parallel.dense_key_to_core_key == state_space.dense_key_to_core_key
+    pd.testing.assert_frame_equal(parallel.core, state_space.core)
+    for key, value in state_space.child_indices.items():
+        np.testing.assert_array_equal(value, parallel.child_indices[key])
+    for key, value in state_space.expected_value_functions.items():
+        np.testing.assert_array_equal(value, parallel.expected_value_functions[key])
+
+
+@pytest.mark.unit
+@pytest.mark.precise
+def test_full_solution_of_period_is_equal_to_solution_per_dense_key(seed):
+    np.random.seed(seed)
+    wages, nonpecs, continuation_values, draws = {}, {}, {}, {}
+    for key in range(10):
+        n_states, n_choices = np.random.randint(1, 20), np.random.randint(1, 5)
+        wages[key] = np.exp(np.random.randn(n_states, n_choices))
+        nonpecs[key] = np.random.randn(n_states, n_choices)
+        continuation_values[key] = np.random.randn(n_states, n_choices)
+        draws[key] = np.random.randn(np.random.randint(1, 50), n_choices)
+
+    expected_value_functions = _full_solution(
+        wages, nonpecs, continuation_values, draws, {"delta": 0.95}
+    )
+
+    for key in wages:
+        expected = calculate_expected_value_functions(
+            wages[key], nonpecs[key], continuation_values[key], draws[key], 0.95
+        )
+        np.testing.assert_array_equal(expected_value_functions[key], expected)
+
+
+@pytest.mark.unit
+def test_object_cache_evicts_least_recently_used_objects():
+    df = pd.DataFrame({"a": np.arange(10, dtype=np.int64)}, index=np.arange(10))
+    n_bytes = int(df.memory_usage(index=True).sum())
+    cache = _ObjectCache(max_bytes=2 * n_bytes)
+
+    cache.put("a", df)
+    cache.put("b", df)
+    assert cache.get("a") is df
+    cache.put("c", df)
+
+    assert cache.get("b") is None
+    assert cache.get("c") is df
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+    assert cache.n_bytes == 2 * n_bytes
+
+    cache.max_bytes = 0
+    cache.put("d", df)
+    assert cache.n_bytes == 0
+
+
+@pytest.mark.integration
+def test_repeated_solutions_do_not_load_states():
+    """Rewards of repeated solutions are computed from the reward covariates."""
+    params, options = process_model_or_seed("kw_94_one")
+    solve = get_solve_func(params, options)
+
+    clear_object_cache()
+    state_space = solve(params)
+    wages = {key: value.copy() for key, value in state_space.wages.items()}
+    info = get_object_cache_info()
+
+    # A new wage parameter forces new rewards.
+    params.loc[("wage_a", "constant"), "value"] += 0.1
+    state_space = solve(params)
+
+    assert get_object_cache_info()["misses"] == info["misses"]
+    assert get_object_cache_info()["hits"] == info["hits"]
+    for key, value in wages.items():
+        assert not np.allclose(state_space.wages[key], value)
+
+
+@pytest.mark.integration
+def test_runs_share_state_space_and_isolate_their_objects():
+    """Runs of the same model share the state space but not their run directories."""
+    params, options = process_model_or_seed("kw_94_one")
+    optim_paras, options = process_params_and_options(params, options)
+    _, other_options = process_params_and_options(params, options)
+    _, new_options = process_params_and_options(params, options)
+    del new_options["cache_run_id"]
+    _, new_options = process_params_and_options(params, new_options)
+
+    assert options["cache_run_id"] == other_options["cache_run_id"]
+    assert options["cache_run_id"] != new_options["cache_run_id"]
+    assert options["state_space_key"] == new_options["state_space_key"]
+
+    for opts in [options, new_options]:
+        state_space = create_state_space_class(optim_paras, opts)
+        assert state_space.options["cache_path"] == options["cache_path"]
+
+    cache = sorted(path.name for path in options["cache_path"].iterdir())
+    assert cache == sorted(["runs", options["state_space_key"]])
+    assert get_run_directory(options).exists()
+    assert not (get_run_directory(options) / options["state_space_key"]).exists()
+
+
+def _get_pid_and_run_directory(options):
+    return os.getpid(), get_run_directory(options, create=True)
+
+
+@pytest.mark.unit
+def test_child_processes_use_their_own_run_directory():
+    params, options = process_model_or_seed("kw_94_one")
+    _, options = process_params_and_options(params, options)
+    directory = get_run_directory(options, create=True)
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        pid, child_directory = pool.apply(_get_pid_and_run_directory, (options,))
+
+    assert pid != os.getpid()
+    assert child_directory != directory
+    assert child_directory.parent == directory.parent
+    assert f"_{pid}_" in child_directory.name
+    assert get_run_directory(options) == directory
+
+
+@pytest.mark.unit
+def test_directories_of_terminated_runs_are_removed():
+    params, options = process_model_or_seed("kw_94_one")
+    _, options = process_params_and_options(params, options)
+
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    terminated = (
+        options["cache_path"]
+        / "runs"
+        / create_run_id().replace(f"_{os.getpid()}_", f"_{process.pid}_")
+    )
+    terminated.mkdir(parents=True)
+    running = options["cache_path"] / "runs" / create_run_id()
+    running.mkdir()
+
+    get_run_directory(options, create=True)
+
+    assert not terminated.exists()
+    assert running.exists()
+
+
 @pytest.mark.integration
 @pytest.mark.precise
 @pytest.mark.parametrize("model", EXAMPLE_MODELS)
@@ -104,6 +560,65 @@ def test_invariance_of_solution(model_or_seed):
         )
 
 
+@pytest.mark.unit
+def test_core_state_space_with_two_lagged_choices_equals_filtered_product(seed):
+    """The core state space is filtered while lagged choices are added.
+
+    The result must equal the former approach which expands all lagged choices, applies
+    the filters afterwards and removes duplicates created by initial experiences.
+
+    """
+    point_constr = {"n_lagged_choices": 2, "n_periods": 4, "observables": False}
+    params, options = process_model_or_seed(seed, point_constr=point_constr)
+    # The number of lagged choices is inferred from the covariates in params.
+    options["covariates"][
+        "edu_lagged_twice"
+    ] = "lagged_choice_1 == 'edu' and lagged_choice_2 == 'edu'"
+    params.loc[("nonpec_edu", "edu_lagged_twice"), "value"] = 0.1
+    options["core_state_space_filters"] = options["core_state_space_filters"] + [
+        "period > 0 and lagged_choice_2 == '{choices_w_exp}' and exp_{choices_w_exp} "
+        "== 0",
+        "period == 1 and lagged_choice_1 == 'edu' and lagged_choice_2 == 'home'",
+    ]
+    optim_paras, options = process_params_and_options(params, options)
+    assert optim_paras["n_lagged_choices"] == 2
+
+    core = _create_core_from_choice_experiences(optim_paras)
+    lagged_choice_cols = ["lagged_choice_1", "lagged_choice_2"]
+    expected = pd.concat(
+        [
+            core.assign(**dict(zip(lagged_choice_cols, lagged_choices)))
+            for lagged_choices in itertools.product(
+                range(len(optim_paras["choices"])), repeat=2
+            )
+        ]
+    )
+    for definition in options["core_state_space_filters"]:
+        expected = expected.loc[~expected.eval(definition)]
+
+    container = []
+    exp_cols = expected.filter(like="exp_").columns.tolist()
+    for initial_exp in itertools.product(
+        *[optim_paras["choices"][c]["start"] for c in optim_paras["choices_w_exp"]]
+    ):
+        df = expected.copy()
+        df[exp_cols] += initial_exp
+        maximum_exp = [
+            optim_paras["choices"][c]["max"] for c in optim_paras["choices_w_exp"]
+        ]
+        container.append(df.loc[df[exp_cols].le(maximum_exp).all(axis="columns")])
+    expected = pd.concat(container).drop_duplicates()
+
+    result = _create_core_state_space(optim_paras, options)
+
+    columns = result.columns.tolist()
+    expected = expected[columns].sort_values(columns).reset_index(drop=True)
+    result = result.sort_values(columns).reset_index(drop=True)
+    assert not result.duplicated().any()
+    assert (result.lagged_choice_2 != result.lagged_choice_1).any()
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
 @pytest.mark.precise
 @pytest.mark.unit
 @pytest.mark.parametrize("model", KEANE_WOLPIN_1994_MODELS)
@@ -151,6 +666,7 @@ def test_create_state_space_vs_specialized_kw94(model):
     assert states_old_set == states_new_set
 
     # Compare indexers via masks for valid indices.
+    indexer_states = set(zip(*np.unravel_index(indexer["codes"], indexer["shape"])))
     for period in range(n_periods):
         index_old_period = indexer_old[period]
         index_old_period = index_old_period != INDEXER_INVALID_INDEX
@@ -162,9 +678,9 @@ def test_create_state_space_vs_specialized_kw94(model):
         ]
 
         for index in indices_old:
-            assert tuple(index) in indexer.keys()
+            assert tuple(index) in indexer_states
 
-        for index in indexer.keys():
+        for index in indexer_states:
             if index[0] == period:
                 assert list(index) in indices_old
 
@@ -214,6 +730,7 @@ def test_create_state_space_vs_specialized_kw97(model):
     assert states_old_set == states_new_set
 
     # Compare indexers via masks for valid indices.
+    indexer_states = set(zip(*np.unravel_index(indexer["codes"], indexer["shape"])))
     for period in range(n_periods):
         index_old_period = indexer_old[period] != INDEXER_INVALID_INDEX
         index_old_period = np.nonzero(index_old_period)
@@ -224,13 +741,71 @@ def test_create_state_space_vs_specialized_kw97(model):
             for i in range(len(index_old_period[0]))
         ]
 
-        for index in indexer.keys():
+        for index in indexer_states:
 
             if index[0] == period:
                 assert list(index) in indices_old
 
         for index in indices_old:
-            assert tuple(index) in indexer.keys()
+            assert tuple(index) in indexer_states
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_indexer_with_and_without_lookup_table(model):
+    """Looking up states with the table and with binary search yields the same keys."""
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 5
+    optim_paras, options = process_params_and_options(params, options)
+
+    core = _create_core_state_space(optim_paras, options)
+    core_period_choice = _create_core_period_choice(core, optim_paras, options)
+    core_key_to_core_indices = dict(enumerate(core_period_choice.values()))
+    indexer = _create_indexer(core, core_key_to_core_indices, optim_paras)
+
+    states = core.to_numpy()
+    core_key, core_index = map_states_to_core_key_and_core_index(states, indexer)
+    core_key_, core_index_ = map_states_to_core_key_and_core_index(
+        states, {**indexer, "positions": None}
+    )
+
+    np.testing.assert_array_equal(core_key, core_key_)
+    np.testing.assert_array_equal(core_index, core_index_)
+    for key, indices in core_key_to_core_indices.items():
+        np.testing.assert_array_equal(core_key[indices], key)
+        np.testing.assert_array_equal(core_index[indices], np.arange(len(indices)))
+
+    invalid_state = states[[-1]].copy()
+    invalid_state[0, 0] += 1
+    for indexer_ in [indexer, {**indexer, "positions": None}]:
+        with pytest.raises(KeyError):
+            map_states_to_core_key_and_core_index(invalid_state, indexer_)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "additional_exp, n_periods",
+    [([], 3), ([4], 6), ([2, 0, 3], 5), ([5, 5, 5, 5], 8), ([1, 2, 1, 3, 2], 4)],
+)
+def test_enumerate_experiences_against_brute_force(additional_exp, n_periods):
+    """Experiences are enumerated in lexicographic order like with a product."""
+    additional_exp = np.array(additional_exp, dtype=np.uint8)
+
+    expected = [
+        exp
+        for exp in itertools.product(*[range(i + 1) for i in additional_exp])
+        if sum(exp) <= n_periods - 1
+    ]
+
+    n_states_per_period = _count_experiences_per_period(additional_exp, n_periods)
+    experiences = _enumerate_experiences(
+        additional_exp, n_periods - 1, n_states_per_period[-1]
+    )
+
+    assert experiences.tolist() == [list(exp) for exp in expected]
+    for period in range(n_periods):
+        n_states = sum(sum(exp) <= period for exp in expected)
+        assert n_states_per_period[period] == n_states
 
 
 @pytest.mark.edge_case
@@ -288,7 +863,10 @@ def test_dense_choice_cores():
     # Retrieve index
     edu_start = np.random.choice(list(optim_paras["choices"]["edu"]["start"].keys()))
     state = (3, 0, 3, edu_start, 1)
-    core_ix = state_space.indexer[state]
+    core_ix = map_states_to_core_key_and_core_index(
+        np.array([state]), state_space.indexer
+    )
+    core_ix = (core_ix[0][0], core_ix[1][0])
 
     # Choose dense covar
     pos = np.random.choice(range(len(state_space.dense)))
@@ -309,7 +887,10 @@ def test_dense_choice_cores():
     # Solve the restricted model
     solve = get_solve_func(params, options)
     state_space = solve(params)
-    core_ix = state_space.indexer[state]
+    core_ix = map_states_to_core_key_and_core_index(
+        np.array([state]), state_space.indexer
+    )
+    core_ix = (core_ix[0][0], core_ix[1][0])
 
     # Get indices
     dense_combination = list(state_space.dense.keys())[pos]
@@ -385,8 +966,10 @@ def test_child_indices():
         child[0] += 1
         child[i + 1] += 1
         child[-1] = i
-        ix = state_space.indexer[tuple(child)]
-        states.append(np.array(ix).reshape(1, 2))
+        ix = map_states_to_core_key_and_core_index(
+            child.reshape(1, -1), state_space.indexer
+        )
+        states.append(np.column_stack(ix))
 
     manual = np.concatenate(states, axis=0)
     np.testing.assert_array_equal(state_space.child_indices[0][0], manual)
@@ -427,3 +1010,261 @@ def test_wage_nonpecs():
             getattr(state_space_, attribute),
             np.testing.assert_array_almost_equal,
         )
+
+
+@pytest.mark.integration
+def test_choice_rewards_are_equal_to_rewards_computed_from_states(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    options["n_periods"] = min(options["n_periods"], 5)
+    state_space = get_solve_func(params, options)(params)
+    optim_paras, options = process_params_and_options(params, state_space.options)
+
+    for key, choice_set in state_space.dense_key_to_choice_set.items():
+        states = load_states(
+            state_space.dense_key_to_core_complex[key],
+            state_space.dense_key_to_dense_variables[key],
+            options,
+        )
+        choices = select_valid_choices(optim_paras["choices"], choice_set)
+        for i, choice in enumerate(choices):
+            if f"wage_{choice}" in optim_paras:
+                log_wages = pandas_dot(states, optim_paras[f"wage_{choice}"])
+                np.testing.assert_allclose(
+                    state_space.wages[key][:, i], np.exp(log_wages)
+                )
+            else:
+                assert (state_space.wages[key][:, i] == 1).all()
+            if f"nonpec_{choice}" in optim_paras:
+                nonpecs = pandas_dot(states, optim_paras[f"nonpec_{choice}"])
+                np.testing.assert_allclose(state_space.nonpecs[key][:, i], nonpecs)
+            else:
+                assert (state_space.nonpecs[key][:, i] == 0).all()
+
+
+@pytest.mark.integration
+def test_solution_skips_stages_whose_parameters_did_not_change(monkeypatch):
+    params, options = process_model_or_seed("kw_97_basic")
+    options["n_periods"] = 3
+    solve = get_solve_func(params, options)
+    expected = solve(params).expected_value_functions.copy()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The stage is computed again.")
+
+    # Type probabilities do not affect the solution.
+    params.loc[("type_2", "up_to_nine_years_school"), "value"] += 1
+    monkeypatch.setattr(rp_solve, "_solve_with_backward_induction", fail)
+    state_space = solve(params)
+    for key, value in expected.items():
+        np.testing.assert_array_equal(state_space.expected_value_functions[key], value)
+    monkeypatch.undo()
+
+    # The discount factor does not affect the rewards.
+    params.loc[("delta", "delta"), "value"] -= 0.01
+    monkeypatch.setattr(rp_solve, "_create_rewards", fail)
+    state_space = solve(params)
+    monkeypatch.undo()
+
+    expected = get_solve_func(params, options)(params).expected_value_functions
+    for key, value in expected.items():
+        np.testing.assert_array_equal(state_space.expected_value_functions[key], value)
+
+
+@pytest.mark.integration
+def test_solutions_are_restored_from_the_solution_cache(monkeypatch):
+    params, options = process_model_or_seed("kw_97_basic")
+    options = {**options, "n_periods": 3, "solution_cache_size": 2}
+    solve = get_solve_func(params, options)
+
+    state_space = solve(params)
+    expected = {k: v.copy() for k, v in state_space.expected_value_functions.items()}
+    key = state_space.stage_keys["expected_value_functions"]
+
+    other_params = params.copy()
+    other_params.loc[("delta", "delta"), "value"] -= 0.01
+    other_key = solve(other_params).stage_keys["expected_value_functions"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The stage is computed again.")
+
+    monkeypatch.setattr(rp_solve, "_create_rewards", fail)
+    monkeypatch.setattr(rp_solve, "_solve_with_backward_induction", fail)
+    state_space = solve(params)
+    for k, value in expected.items():
+        np.testing.assert_array_equal(state_space.expected_value_functions[k], value)
+    monkeypatch.undo()
+
+    # The state space receives copies of the cached solution.
+    for attribute in ["wages", "nonpecs", "draws_emax_risk"]:
+        for k, value in state_space.solution_cache[key][attribute].items():
+            assert not np.shares_memory(getattr(state_space, attribute)[k], value)
+
+    # The least recently used solution is evicted.
+    other_params.loc[("delta", "delta"), "value"] -= 0.01
+    state_space = solve(other_params)
+    assert len(state_space.solution_cache) == 2
+    assert key in state_space.solution_cache
+    assert other_key not in state_space.solution_cache
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    "model, integration, out_of_core",
+    [
+        ("robinson_crusoe_basic", "monte_carlo", False),
+        ("kw_94_one", "monte_carlo", False),
+        ("kw_94_one", "gauss_hermite", False),
+        ("kw_94_one", "monte_carlo", True),
+        ("robinson_crusoe_basic", "analytic", True),
+    ],
+)
+def test_batch_solution_is_equal_to_individual_solutions(
+    model, integration, out_of_core
+):
+    params, options = process_model_or_seed(model)
+    options = {
+        **options,
+        "n_periods": 4,
+        "solution_integration": integration,
+        "solution_out_of_core": out_of_core,
+    }
+
+    params_batch = [params.copy() for _ in range(3)]
+    params_batch[1].loc[("delta", "delta"), "value"] = 0
+    is_nonpec = params.index.get_level_values(0).str.startswith("nonpec")
+    params_batch[2].loc[is_nonpec, "value"] += 0.5
+
+    solve_batch = get_batch_solve_func(params, options)
+    solutions = solve_batch(params_batch)
+
+    # Solving another batch does not change the solutions of the first batch.
+    other_params_batch = [params_.copy() for params_ in params_batch]
+    for params_ in other_params_batch:
+        params_.loc[is_nonpec, "value"] -= 1
+    solve_batch(other_params_batch)
+
+    solve = get_solve_func(params, options)
+    for params_, solution in zip(params_batch, solutions):
+        state_space = solve(params_)
+        for attribute in ["wages", "nonpecs", "expected_value_functions"]:
+            for key, value in getattr(state_space, attribute).items():
+                assert not isinstance(solution[attribute][key], np.memmap)
+                np.testing.assert_allclose(solution[attribute][key], value)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("n_wages", [0, 1, 2])
+def test_analytic_expected_value_function_is_close_to_monte_carlo(n_wages):
+    np.random.seed(0)
+    wages = np.array([2.0, 2.5, 1.0])
+    nonpecs = np.array([0.5, 0.0, 1.0])
+    continuation_values = np.array([3.0, 2.5, 3.5])
+    shocks_cholesky = np.array([[0.3, 0, 0], [0.1, 0.2, 0], [-0.3, 0.2, 0.5]])
+    shocks_cov = shocks_cholesky.dot(shocks_cholesky.T)
+
+    draws = np.random.randn(1_000_000, 3).dot(shocks_cholesky.T)
+    draws[:, :n_wages] = np.exp(draws[:, :n_wages])
+    expected = calculate_expected_value_functions(
+        wages, nonpecs, continuation_values, draws, 0.95
+    )
+
+    result = calculate_analytic_expected_value_function(
+        wages, nonpecs, continuation_values, shocks_cov, n_wages, 0.95
+    )
+    # The maximum of two normal variables is computed in closed form.
+    result_two_choices = calculate_analytic_expected_value_function(
+        wages[1:], nonpecs[1:], continuation_values[1:], shocks_cov[1:, 1:], 0, 0.95
+    )
+    expected_two_choices = calculate_expected_value_functions(
+        wages[1:], nonpecs[1:], continuation_values[1:], draws[:, 1:], 0.95
+    )
+
+    np.testing.assert_allclose(result, expected, rtol=5e-3)
+    if n_wages <= 1:
+        np.testing.assert_allclose(result_two_choices, expected_two_choices, rtol=1e-3)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model", ["robinson_crusoe_basic", "kw_94_one", "kw_97_basic"])
+def test_analytic_solution_is_close_to_monte_carlo_solution(model):
+    params, options = process_model_or_seed(model)
+    options = {**options, "n_periods": 5, "interpolation_points": -1}
+
+    monte_carlo = get_solve_func(params, {**options, "solution_draws": 5_000})(params)
+    analytic = get_solve_func(params, {**options, "solution_integration": "analytic"})(
+        params
+    )
+
+    for key, value in monte_carlo.expected_value_functions.items():
+        np.testing.assert_allclose(
+            analytic.expected_value_functions[key], value, rtol=0.05
+        )
+
+
+@pytest.mark.integration
+def test_analytic_solution_creates_draws_only_for_interpolated_periods():
+    params, options = process_model_or_seed("kw_94_one")
+    options = {**options, "n_periods": 6, "solution_integration": "analytic"}
+
+    state_space = get_solve_func(params, {**options, "interpolation_points": -1})(
+        params
+    )
+    assert state_space.base_draws_sol == {}
+    assert state_space.draws_emax_risk == {}
+
+    options = {**options, "interpolation_points": 20}
+    state_space = get_solve_func(params, options)(params)
+    monte_carlo = get_solve_func(
+        params, {**options, "solution_integration": "monte_carlo"}
+    )(params)
+
+    interpolated_keys = [
+        key
+        for period in range(options["n_periods"])
+        if state_space.is_period_interpolated(period, options)
+        for key in state_space.get_dense_keys_from_period(period)
+    ]
+    assert 0 < len(interpolated_keys) < len(state_space.dense_key_to_complex)
+    assert set(state_space.base_draws_sol) == set(interpolated_keys)
+    for key in interpolated_keys:
+        np.testing.assert_array_equal(
+            state_space.base_draws_sol[key], monte_carlo.base_draws_sol[key]
+        )
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("rule", ["gauss_hermite", "smolyak"])
+@pytest.mark.parametrize("n_choices", [1, 3, 5])
+def test_quadrature_rules_integrate_moments_of_standard_normal_distribution(
+    rule, n_choices
+):
+    nodes, weights = create_base_nodes_and_weights(n_choices, rule, 2)
+
+    np.testing.assert_allclose(weights.sum(), 1)
+    np.testing.assert_allclose(weights.dot(nodes), 0, atol=1e-12)
+    np.testing.assert_allclose(
+        (nodes * weights[:, np.newaxis]).T.dot(nodes), np.eye(n_choices), atol=1e-12
+    )
+    np.testing.assert_allclose(weights.dot(nodes ** 4), 3)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model", ["robinson_crusoe_basic", "kw_94_one"])
+def test_gauss_hermite_solution_is_close_to_monte_carlo_solution(model):
+    params, options = process_model_or_seed(model)
+    options = {**options, "n_periods": 5, "interpolation_points": -1}
+
+    monte_carlo = get_solve_func(params, {**options, "solution_draws": 5_000})(params)
+    quadrature = get_solve_func(
+        params,
+        {
+            **options,
+            "solution_integration": "gauss_hermite",
+            "solution_quadrature_order": 3,
+        },
+    )(params)
+
+    for key, value in monte_carlo.expected_value_functions.items():
+        np.testing.assert_allclose(
+            quadrature.expected_value_functions[key], value, rtol=0.01
+        )